@@ -7,11 +7,12 @@ from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from limits.storage import RedisStorage
-from sqlalchemy import text
 from config import config
+from .database import RoutingSession
+from .json_provider import FastJSONProvider
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 csrf = CSRFProtect()
@@ -23,6 +24,7 @@ limiter = Limiter(
 
 def create_app(config_name='default'):
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     
     # Load configuration
     app.config.from_object(config[config_name])
@@ -39,6 +41,15 @@ def create_app(config_name='default'):
     csrf.init_app(app)
     limiter.init_app(app)
     
+    from .cache import cache
+    cache.init_app(app)
+    
+    from .events import events
+    events.init_app(app)
+    
+    from .compression import init_compression
+    init_compression(app)
+    
     # Configure security headers
     app.config['SESSION_COOKIE_SECURE'] = False  # Set to False for development
     app.config['SESSION_COOKIE_HTTPONLY'] = True
@@ -62,44 +73,14 @@ def create_app(config_name='default'):
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return User.get_cached(int(user_id))
     
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
     
-    # Create database tables and initialize required data
-    with app.app_context():
-        try:
-            # Create schemas first
-            db.session.execute(text('CREATE SCHEMA IF NOT EXISTS workboard'))
-            db.session.execute(text('CREATE SCHEMA IF NOT EXISTS netbox'))
-            db.session.commit()
-            
-            # Then create all tables
-            db.create_all()
-            
-            # Create admin user using the User model's create_admin method
-            from .models.user import User
-            admin = User.create_admin(username='admin', password='admin')
-            if admin:
-                print("Created initial admin user")
-            
-            # Initialize AppSettings if it doesn't exist
-            from .models.settings import AppSettings
-            settings = AppSettings.get_settings()
-            if not settings:
-                settings = AppSettings(
-                    netbox_url='',
-                    netbox_token='',
-                    sync_interval=300,
-                    is_connected=False
-                )
-                db.session.add(settings)
-                db.session.commit()
-        except Exception as e:
-            print(f"Error during initialization: {str(e)}")
-            db.session.rollback()
-            raise
+    # Schema creation and seeding run once via `flask init-db`, not in every worker
+    from .commands import init_db_command
+    app.cli.add_command(init_db_command)
     
     @app.after_request
     def after_request(response):
@@ -162,7 +143,7 @@ def create_app(config_name='default'):
         # Check Netbox connection status
         if request.endpoint != 'settings.index' and not is_api:
             # Only check connection status if not already on settings page and not an API endpoint
-            settings = AppSettings.get_settings()
+            settings = AppSettings.get_cached()
             if not settings or not settings.is_connected:
                 return redirect(url_for('settings.index'))
     
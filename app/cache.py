@@ -0,0 +1,121 @@
+import time
+import logging
+import threading
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel used to drop cached entries in every web and worker process
+INVALIDATION_CHANNEL = 'crumple:cache:invalidate'
+
+# Message that clears the whole cache
+INVALIDATE_ALL = '*'
+
+class LocalCache:
+    """Per-process cache whose entries are invalidated across processes via Redis pub/sub.
+
+    Entries also expire after ``ttl`` seconds, which bounds staleness while the
+    invalidation listener is disconnected. A ttl of 0 disables caching.
+    """
+
+    def __init__(self, redis_url=None, ttl=60):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._redis = None
+
+    def init_app(self, app):
+        """Configure from the Flask app config"""
+        self.redis_url = app.config.get('REDIS_URL')
+        self.ttl = app.config.get('LOCAL_CACHE_TTL', self.ttl)
+        app.extensions['local_cache'] = self
+
+    @property
+    def redis(self):
+        if self._redis is None and self.redis_url:
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=5)
+        return self._redis
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss. None is never cached."""
+        if not self.ttl:
+            return loader()
+
+        self._ensure_listener()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[1] > now:
+            return entry[0]
+
+        value = loader()
+        if value is not None:
+            with self._lock:
+                self._entries[key] = (value, now + self.ttl)
+        return value
+
+    def invalidate(self, key, publish=True):
+        """Drop key locally and, unless publish is False, in every other process"""
+        self._drop(key)
+        if publish and self.redis is not None:
+            try:
+                self.redis.publish(INVALIDATION_CHANNEL, key)
+            except redis.RedisError as e:
+                logger.warning(f"Failed to publish cache invalidation for {key}: {str(e)}")
+
+    def invalidate_on_commit(self, session, key):
+        """Invalidate key once the session's current transaction commits"""
+        session.info.setdefault('cache_invalidations', set()).add(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _drop(self, key):
+        with self._lock:
+            if key == INVALIDATE_ALL:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _ensure_listener(self):
+        """Start the pub/sub listener thread on first use (never at import or before fork)"""
+        if self._listener is not None or self.redis is None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                # Dedicated client without a socket timeout, since listen() blocks between messages
+                client = redis.Redis.from_url(self.redis_url, health_check_interval=30)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    key = message.get('data')
+                    if isinstance(key, bytes):
+                        key = key.decode()
+                    self._drop(key)
+            except Exception as e:
+                # Invalidations may have been missed while disconnected
+                logger.warning(f"Cache invalidation listener disconnected: {str(e)}")
+                self.clear()
+                time.sleep(5)
+
+cache = LocalCache()
+
+@event.listens_for(Session, 'after_commit')
+def _publish_invalidations(session):
+    for key in session.info.pop('cache_invalidations', ()):
+        cache.invalidate(key)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('cache_invalidations', None)
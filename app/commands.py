@@ -0,0 +1,73 @@
+import os
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_migrate import upgrade, stamp
+from sqlalchemy import text, inspect
+from . import db
+
+# Revision matching the schema init.sql created before it recorded its own
+# revision; databases built then are stamped here and upgraded from it
+BASELINE_REVISION = '20250204_145600'
+
+def run_init_sql():
+    """Build the full schema from init.sql, as the Postgres container does for a new volume.
+
+    It holds objects the models cannot create (extensions, materialized
+    views, trigram indexes) and records its revision in alembic_version.
+    """
+    path = os.path.join(os.path.dirname(current_app.root_path), 'init.sql')
+    with open(path) as f:
+        script = f.read()
+    # Raw DBAPI cursor: the script is sent as is, without parameter interpolation
+    connection = db.engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(script)
+        connection.commit()
+    finally:
+        connection.close()
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Bring the schema to the latest migration and seed the admin user and settings"""
+    from .models.user import User
+    from .models.settings import AppSettings
+
+    try:
+        # Create schemas first
+        db.session.execute(text('CREATE SCHEMA IF NOT EXISTS workboard'))
+        db.session.execute(text('CREATE SCHEMA IF NOT EXISTS netbox'))
+        db.session.commit()
+        
+        # init.sql records its revision in alembic_version; older volumes have
+        # the tables without it, and an empty database is built from init.sql
+        inspector = inspect(db.engine)
+        if not inspector.has_table('alembic_version'):
+            if inspector.has_table('clusters', schema='workboard'):
+                stamp(revision=BASELINE_REVISION)
+            else:
+                run_init_sql()
+        upgrade()
+        click.echo("Database schema is up to date")
+        
+        # Create admin user using the User model's create_admin method
+        admin = User.create_admin(username='admin', password='admin')
+        if admin:
+            click.echo("Created initial admin user")
+        
+        # Initialize AppSettings if it doesn't exist
+        if not AppSettings.query.first():
+            settings = AppSettings(
+                netbox_url='',
+                netbox_token='',
+                sync_interval=300,
+                is_connected=False
+            )
+            db.session.add(settings)
+            db.session.commit()
+            click.echo("Created default settings")
+    except Exception as e:
+        db.session.rollback()
+        raise click.ClickException(f"Error during initialization: {str(e)}")
@@ -0,0 +1,70 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/yaml',
+    'text/html',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'application/vnd.crumple.columnar+msgpack',
+}
+
+def supported_encodings():
+    """Content codings this process can produce, in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def encoded_etag(etag, encoding):
+    """ETag for an encoded representation; distinct from the identity ETag"""
+    return f'{etag}-{encoding}'
+
+def etag_variants(etag):
+    """The identity ETag and every encoded variant a client may revalidate with"""
+    return [etag] + [encoded_etag(etag, encoding) for encoding in ('br', 'gzip')]
+
+def negotiate_encoding():
+    """Pick the best content coding the client accepts, or None"""
+    accepted = request.accept_encodings
+    for encoding in supported_encodings():
+        if accepted[encoding] > 0:
+            return encoding
+    return None
+
+def compress(data, encoding, app):
+    if encoding == 'br':
+        return brotli.compress(data, quality=app.config.get('COMPRESSION_BROTLI_QUALITY', 5))
+    return gzip.compress(data, compresslevel=app.config.get('COMPRESSION_GZIP_LEVEL', 6))
+
+def init_compression(app):
+    """Compress buffered responses above COMPRESSION_MIN_SIZE bytes"""
+
+    @app.after_request
+    def compress_response(response):
+        if (response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or response.direct_passthrough
+                or response.is_streamed
+                or response.status_code < 200
+                or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if encoding is None or response.content_length is None:
+            return response
+        if response.content_length < app.config.get('COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        response.set_data(compress(response.get_data(), encoding, app))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(encoded_etag(etag, encoding), weak)
+        return response
@@ -0,0 +1,135 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_request_context, current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.expression import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+# Bind key of the optional read replica in SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+
+# How long a replica health result is trusted before it is checked again
+REPLICA_HEALTH_INTERVAL = 5
+
+_replica_health = {'healthy': False, 'checked_at': None}
+
+def replica_available(engine):
+    """Check (at most every few seconds) whether the replica accepts connections"""
+    now = time.monotonic()
+    first_check = _replica_health['checked_at'] is None
+    if not first_check and now - _replica_health['checked_at'] < REPLICA_HEALTH_INTERVAL:
+        return _replica_health['healthy']
+
+    _replica_health['checked_at'] = now
+    try:
+        with engine.connect() as connection:
+            # Health checks must not count against a view's query budget
+            connection.execution_options(query_budget_exempt=True).execute(text('SELECT 1'))
+        if not _replica_health['healthy']:
+            logger.info("Read replica is available, routing read-only endpoints to it")
+        _replica_health['healthy'] = True
+    except Exception as e:
+        if _replica_health['healthy'] or first_check:
+            logger.warning(f"Read replica unavailable, falling back to primary: {str(e)}")
+        _replica_health['healthy'] = False
+    return _replica_health['healthy']
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica bind for requests that opted in.
+
+    Flushes and DML always use the primary, as does everything outside a
+    request (the sync worker) and any request whose view is not marked with
+    :func:`read_replica`.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None
+                and not self._flushing
+                and not isinstance(clause, UpdateBase)
+                and has_request_context()
+                and g.get('use_replica')):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None and replica_available(engine):
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def read_replica(view):
+    """Route the queries of a read-only view to the replica when one is configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block of code executes more SQL statements than allowed"""
+
+class QueryCounter:
+    """Count the SQL statements executed by the current thread while active"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        self._thread_id = None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() != self._thread_id:
+            return
+        if conn.get_execution_options().get('query_budget_exempt'):
+            return
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        event.remove(Engine, 'before_cursor_execute', self._before_cursor_execute)
+
+@contextmanager
+def assert_max_queries(max_queries, label='block'):
+    """Fail with QueryBudgetExceeded if the block runs more than max_queries statements"""
+    with QueryCounter() as counter:
+        yield counter
+    if counter.count > max_queries:
+        statements = '\n'.join(f'  {statement}' for statement in counter.statements)
+        raise QueryBudgetExceeded(
+            f"{label} executed {counter.count} queries (budget {max_queries}):\n{statements}"
+        )
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL statements a view may execute.
+
+    Statements are only counted when QUERY_BUDGET_ENFORCE or QUERY_BUDGET_LOG
+    is set. With QUERY_BUDGET_ENFORCE (on in the testing config) an overrun
+    raises QueryBudgetExceeded, so N+1 regressions fail in tests; with
+    QUERY_BUDGET_LOG it is only logged. Otherwise the decorator adds nothing.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            enforce = current_app.config.get('QUERY_BUDGET_ENFORCE')
+            if not enforce and not current_app.config.get('QUERY_BUDGET_LOG'):
+                return view(*args, **kwargs)
+
+            label = f"View {view.__module__}.{view.__name__}"
+            if enforce:
+                with assert_max_queries(max_queries, label=label):
+                    return view(*args, **kwargs)
+
+            with QueryCounter() as counter:
+                response = view(*args, **kwargs)
+            if counter.count > max_queries:
+                logger.warning(f"{label} executed {counter.count} queries (budget {max_queries})")
+            return response
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
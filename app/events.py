@@ -0,0 +1,293 @@
+import json
+import time
+import queue
+import asyncio
+import logging
+import threading
+import redis
+from contextlib import aclosing
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel carrying sync and topology events from the worker to every web process
+EVENTS_CHANNEL = 'crumple:events'
+
+# WSGI environ key through which event_response hands its stream to EventStreamApp
+ASYNC_STREAM_KEY = 'crumple.event_stream'
+
+class EventHub:
+    """Fans events published on Redis out to the Server-Sent Event streams of this process.
+
+    One listener thread per process holds the only pub/sub connection; each
+    open stream gets a bounded in-memory queue, so browsers add no Redis or
+    database load while they wait.
+    """
+
+    def __init__(self, redis_url=None, heartbeat=15, max_age=300):
+        self.redis_url = redis_url
+        self.heartbeat = heartbeat
+        self.max_age = max_age
+        self._subscribers = set()
+        self._async_subscribers = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._redis = None
+
+    def init_app(self, app):
+        """Configure from the Flask app config"""
+        self.redis_url = app.config.get('REDIS_URL')
+        self.heartbeat = app.config.get('EVENTS_HEARTBEAT', self.heartbeat)
+        self.max_age = app.config.get('EVENTS_MAX_AGE', self.max_age)
+        app.extensions['event_hub'] = self
+
+    @property
+    def available(self):
+        return bool(self.redis_url)
+
+    @property
+    def redis(self):
+        if self._redis is None and self.redis_url:
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=5)
+        return self._redis
+
+    def publish(self, event_type, cluster=None, **data):
+        """Publish an event about cluster (a Cluster or None) to every web process; failures are logged"""
+        if self.redis is None:
+            return
+        event = {'type': event_type, **data}
+        if cluster is not None:
+            event['cluster_id'] = str(cluster.id) if cluster.id else None
+            event['netbox_id'] = cluster.netbox_id
+        try:
+            self.redis.publish(EVENTS_CHANNEL, json.dumps(event, default=str))
+        except redis.RedisError as e:
+            logger.warning(f"Failed to publish {event_type} event: {str(e)}")
+
+    def subscribe(self):
+        """Queue receiving every event published from now on"""
+        self._ensure_listener()
+        subscriber = queue.Queue(maxsize=100)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscribe_async(self):
+        """asyncio queue receiving every event published from now on, fed from the listener thread"""
+        self._ensure_listener()
+        subscriber = asyncio.Queue(maxsize=100)
+        with self._lock:
+            self._async_subscribers[subscriber] = asyncio.get_running_loop()
+        return subscriber
+
+    def unsubscribe_async(self, subscriber):
+        with self._lock:
+            self._async_subscribers.pop(subscriber, None)
+
+    def stream(self, matches, initial=None):
+        """Server-Sent Event lines for events accepted by matches(event).
+
+        initial is sent first so a (re)connecting client learns the current
+        state. The stream ends after max_age seconds and the browser
+        reconnects, which bounds how long a worker thread is held.
+        """
+        subscriber = self.subscribe()
+        try:
+            yield 'retry: 3000\n\n'
+            if initial is not None:
+                yield format_event(initial)
+            deadline = time.monotonic() + self.max_age
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event = subscriber.get(timeout=min(self.heartbeat, remaining))
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                if matches(event):
+                    yield format_event(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def stream_async(self, matches, initial=None, closed=None):
+        """stream() for the event loop: waits on an asyncio queue instead of holding a thread.
+
+        closed is a future that completes when the client disconnects.
+        """
+        subscriber = self.subscribe_async()
+        try:
+            yield 'retry: 3000\n\n'
+            if initial is not None:
+                yield format_event(initial)
+            deadline = time.monotonic() + self.max_age
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                getter = asyncio.ensure_future(subscriber.get())
+                waiting = {getter} if closed is None else {getter, closed}
+                done, _ = await asyncio.wait(waiting, timeout=min(self.heartbeat, remaining),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    if closed is not None and closed in done:
+                        return
+                    yield ': keepalive\n\n'
+                    continue
+                event = getter.result()
+                if matches(event):
+                    yield format_event(event)
+        finally:
+            self.unsubscribe_async(subscriber)
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            async_subscribers = list(self._async_subscribers.items())
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # A stalled client misses events; its next status event resynchronises it
+                pass
+        for subscriber, loop in async_subscribers:
+            try:
+                loop.call_soon_threadsafe(put_unless_full, subscriber, event)
+            except RuntimeError:
+                # The stream's event loop has shut down
+                self.unsubscribe_async(subscriber)
+
+    def _ensure_listener(self):
+        """Start the pub/sub listener thread on first use (never at import or before fork)"""
+        if self._listener is not None or not self.redis_url:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='event-hub', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                # Dedicated client without a socket timeout, since listen() blocks between messages
+                client = redis.Redis.from_url(self.redis_url, health_check_interval=30)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(EVENTS_CHANNEL)
+                for message in pubsub.listen():
+                    try:
+                        self._dispatch(json.loads(message['data']))
+                    except (TypeError, ValueError):
+                        logger.warning(f"Ignoring malformed event: {message.get('data')!r}")
+            except Exception as e:
+                logger.warning(f"Event listener disconnected: {str(e)}")
+                time.sleep(5)
+
+def status_event(cluster):
+    """Current sync state of a cluster, sent when a stream opens"""
+    return {
+        'type': 'status',
+        'cluster_id': str(cluster.id),
+        'netbox_id': cluster.netbox_id,
+        'sync_in_progress': cluster.sync_in_progress,
+        'last_sync': cluster.last_sync.isoformat() if cluster.last_sync else None,
+        'topology_version': cluster.topology_version
+    }
+
+def for_cluster(cluster):
+    """Event filter for one cluster's stream; events naming no cluster go to every stream"""
+    cluster_id, netbox_id = str(cluster.id), cluster.netbox_id
+
+    def matches(event):
+        if event.get('cluster_id') is None and event.get('netbox_id') is None:
+            return True
+        return event.get('cluster_id') == cluster_id or event.get('netbox_id') == netbox_id
+    return matches
+
+def event_response(matches, initial=None):
+    """Streaming text/event-stream response over events.stream().
+
+    Served through EventStreamApp, the response carries only the headers and
+    the stream itself is handed to the event loop.
+    """
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Let reverse proxies pass events through immediately
+    }
+    stream = request.environ.get(ASYNC_STREAM_KEY)
+    if stream is not None:
+        stream.update(matches=matches, initial=initial)
+        return Response(iter(()), mimetype='text/event-stream', headers=headers)
+    return Response(events.stream(matches, initial), mimetype='text/event-stream', headers=headers)
+
+def put_unless_full(subscriber, event):
+    try:
+        subscriber.put_nowait(event)
+    except asyncio.QueueFull:
+        pass
+
+def format_event(event):
+    """Encode an event dict as one Server-Sent Event named after its type"""
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+
+class EventStreamInstance(WsgiToAsgiInstance):
+    """WsgiToAsgi request whose environ lets event_response defer its stream"""
+
+    def build_environ(self, scope, body):
+        environ = super().build_environ(scope, body)
+        environ[ASYNC_STREAM_KEY] = self.stream = {}
+        return environ
+
+class EventStreamApp:
+    """ASGI application serving Flask through WsgiToAsgi, with event streams on the event loop.
+
+    WsgiToAsgi runs every request of the process on one shared thread, so a
+    stream held open there would stall all other requests. Event routes still
+    run through Flask (authentication, rate limits, lookups, the status event);
+    only the wait for events moves to a coroutine.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'GET' or not scope['path'].endswith('/events'):
+            return await self.wsgi(scope, receive, send)
+
+        # The Flask response is short (headers only, or an error), so buffer it
+        messages = []
+
+        async def buffer(message):
+            messages.append(message)
+
+        instance = EventStreamInstance(self.flask_app)
+        await instance(scope, receive, buffer)
+        stream = getattr(instance, 'stream', None)
+        if not stream:
+            for message in messages:
+                await send(message)
+            return
+
+        closed = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            await send(messages[0])
+            async with aclosing(events.stream_async(stream['matches'], stream['initial'], closed)) as chunks:
+                async for chunk in chunks:
+                    await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            closed.cancel()
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+events = EventHub()
@@ -0,0 +1,22 @@
+import os
+import logging
+
+LOG_DIR = 'logs'
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def attach_file_handler(logger, filename):
+    """Attach a DEBUG file handler under logs/ to logger, once.
+
+    Called when a service is first used rather than at import time, so importing
+    the app never touches the filesystem.
+    """
+    path = os.path.join(LOG_DIR, filename)
+    for handler in logger.handlers:
+        if isinstance(handler, logging.FileHandler) and handler.baseFilename == os.path.abspath(path):
+            return
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    fh = logging.FileHandler(path)
+    fh.setLevel(logging.DEBUG)
+    fh.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.addHandler(fh)
@@ -4,5 +4,8 @@ from .cluster import Cluster
 from .device import Device
 from .connection import Connection
 from .device_role import DeviceRole
+from .layout_snapshot import LayoutSnapshot
+from .cluster_link import ClusterLink
+from .topology_change import TopologyChange
 
-__all__ = ['db', 'AppSettings', 'Cluster', 'Device', 'Connection', 'DeviceRole']
+__all__ = ['db', 'AppSettings', 'Cluster', 'Device', 'Connection', 'DeviceRole', 'LayoutSnapshot', 'ClusterLink', 'TopologyChange']
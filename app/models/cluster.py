@@ -1,5 +1,6 @@
 from .. import db
 from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import deferred
 import uuid
 
 class Cluster(db.Model):
@@ -15,6 +16,10 @@ class Cluster(db.Model):
     meta_data = db.Column(JSONB)  # For Netbox metadata
     last_sync = db.Column(db.DateTime(timezone=True))
     sync_in_progress = db.Column(db.Boolean, default=False)
+    topology_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped by sync and layout writes
+    changes_since = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Oldest version the change journal can be replayed from
+    graph_digest = db.Column(db.String(64))  # Hash of devices and links in the graph index; cleared when a sync changes them
+    analytics = deferred(db.Column(JSONB))  # Structural metrics computed after sync; loaded only when asked for
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
 
@@ -22,6 +27,41 @@ class Cluster(db.Model):
     devices = db.relationship('Device', backref='cluster', lazy=True, cascade='all, delete-orphan')
     connections = db.relationship('Connection', backref='cluster', lazy=True, cascade='all, delete-orphan')
 
+    @classmethod
+    def summary_query(cls):
+        """Query only the columns list views need, extracting JSONB sub-keys in SQL"""
+        return db.session.query(
+            cls.id,
+            cls.netbox_id,
+            cls.name,
+            cls.type,
+            cls.meta_data['status'].astext.label('status'),
+            cls.meta_data['device_count'].as_integer().label('device_count'),
+            cls.last_sync,
+            cls.sync_in_progress,
+            cls.topology_version
+        ).order_by(cls.name)
+
+    @staticmethod
+    def summary_to_dict(row):
+        """Convert a summary_query row to dictionary"""
+        return {
+            'id': str(row.id),
+            'netbox_id': row.netbox_id,
+            'name': row.name,
+            'type': row.type,
+            'status': row.status,
+            'device_count': row.device_count or 0,
+            'last_sync': row.last_sync.isoformat() if row.last_sync else None,
+            'sync_in_progress': row.sync_in_progress,
+            'topology_version': row.topology_version
+        }
+
+    def bump_topology_version(self):
+        """Mark devices, connections or positions as changed (atomic increment in SQL)"""
+        self.topology_version = Cluster.topology_version + 1
+        db.session.add(self)
+
     def update_from_netbox(self, data):
         """Update cluster from Netbox data"""
         self.netbox_id = data['id']
@@ -53,6 +93,7 @@ class Cluster(db.Model):
             'meta_data': dict(self.meta_data) if self.meta_data else {},
             'last_sync': self.last_sync.isoformat() if self.last_sync else None,
             'sync_in_progress': self.sync_in_progress,
+            'topology_version': self.topology_version,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -0,0 +1,105 @@
+from .. import db
+from sqlalchemy import update, delete, or_
+from sqlalchemy.dialects.postgresql import JSONB, UUID, insert
+import uuid
+
+class ClusterLink(db.Model):
+    """Cable whose endpoints sit in different clusters.
+
+    Endpoints are stored in (device name, interface) order so the same cable
+    seen from either cluster's sync maps to one row. Device and cluster ids
+    stay NULL until the far-end cluster has been synced.
+    """
+    __tablename__ = 'cluster_links'
+    __table_args__ = (
+        db.UniqueConstraint('device_a_name', 'interface_a', 'device_b_name', 'interface_b', name='uq_cluster_links_endpoints'),
+        db.Index('idx_cluster_links_cluster_a_id', 'cluster_a_id'),
+        db.Index('idx_cluster_links_cluster_b_id', 'cluster_b_id'),
+        {'schema': 'workboard'}
+    )
+
+    id = db.Column(UUID, primary_key=True, default=uuid.uuid4)
+    device_a_name = db.Column(db.String(255), nullable=False)
+    interface_a = db.Column(db.String(255), nullable=False)
+    device_b_name = db.Column(db.String(255), nullable=False)
+    interface_b = db.Column(db.String(255), nullable=False)
+    device_a_id = db.Column(UUID, db.ForeignKey('workboard.devices.id', ondelete='SET NULL'))
+    device_b_id = db.Column(UUID, db.ForeignKey('workboard.devices.id', ondelete='SET NULL'))
+    cluster_a_id = db.Column(UUID, db.ForeignKey('workboard.clusters.id', ondelete='SET NULL'))
+    cluster_b_id = db.Column(UUID, db.ForeignKey('workboard.clusters.id', ondelete='SET NULL'))
+    meta_data = db.Column(JSONB)
+    synced_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
+
+    @staticmethod
+    def endpoints(device_a, interface_a, device_b, interface_b):
+        """Canonical ((name, interface), (name, interface)) order of a cable's ends"""
+        return tuple(sorted([(device_a, interface_a), (device_b, interface_b)]))
+
+    @classmethod
+    def replace_for(cls, cluster, links, synced_at):
+        """Upsert the inter-cluster links seen by a cluster's sync and drop the ones it no longer sees.
+
+        links maps endpoints() keys to their cable metadata. Also resolves the
+        device and cluster ids of links recorded before their far end was
+        synced. The caller commits.
+        """
+        if links:
+            stmt = insert(cls).values([
+                {
+                    'id': uuid.uuid4(),
+                    'device_a_name': a_name, 'interface_a': a_interface,
+                    'device_b_name': b_name, 'interface_b': b_interface,
+                    'meta_data': meta_data, 'synced_at': synced_at
+                }
+                for ((a_name, a_interface), (b_name, b_interface)), meta_data in links.items()
+            ])
+            db.session.execute(stmt.on_conflict_do_update(
+                constraint='uq_cluster_links_endpoints',
+                set_={'meta_data': stmt.excluded.meta_data, 'synced_at': stmt.excluded.synced_at}
+            ))
+
+        db.session.execute(
+            delete(cls).where(
+                or_(cls.cluster_a_id == cluster.id, cls.cluster_b_id == cluster.id),
+                cls.synced_at < synced_at
+            ).execution_options(synchronize_session=False)
+        )
+        cls.resolve()
+
+    @classmethod
+    def resolve(cls):
+        """Fill device and cluster ids from device names, one set-based UPDATE per side"""
+        from .device import Device  # Import here to avoid circular dependency
+
+        for name, device_id, cluster_id in (
+            (cls.device_a_name, cls.device_a_id, cls.cluster_a_id),
+            (cls.device_b_name, cls.device_b_id, cls.cluster_b_id)
+        ):
+            db.session.execute(
+                update(cls)
+                .where(Device.name == name, or_(device_id.is_(None), cluster_id.is_distinct_from(Device.cluster_id)))
+                .values({device_id: Device.id, cluster_id: Device.cluster_id})
+                .execution_options(synchronize_session=False)
+            )
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'device_a': {
+                'id': str(self.device_a_id) if self.device_a_id else None,
+                'name': self.device_a_name,
+                'interface': self.interface_a,
+                'cluster_id': str(self.cluster_a_id) if self.cluster_a_id else None
+            },
+            'device_b': {
+                'id': str(self.device_b_id) if self.device_b_id else None,
+                'name': self.device_b_name,
+                'interface': self.interface_b,
+                'cluster_id': str(self.cluster_b_id) if self.cluster_b_id else None
+            },
+            'status': self.meta_data.get('status') if isinstance(self.meta_data, dict) else None,
+            'synced_at': self.synced_at.isoformat() if self.synced_at else None
+        }
+
+    def __repr__(self):
+        return f'<ClusterLink {self.device_a_name}:{self.interface_a} - {self.device_b_name}:{self.interface_b}>'
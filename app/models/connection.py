@@ -1,11 +1,20 @@
 from .. import db
+from sqlalchemy import inspect
 from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import joinedload
 import uuid
 
 class Connection(db.Model):
     """Connection model representing a cable connection between devices"""
     __tablename__ = 'connections'
-    __table_args__ = {'schema': 'workboard'}
+    __table_args__ = (
+        db.Index('idx_connections_cluster_id', 'cluster_id'),
+        # Foreign keys are not indexed automatically; Device relationships and cascades need these
+        db.Index('idx_connections_device_a_id', 'device_a_id'),
+        db.Index('idx_connections_device_b_id', 'device_b_id'),
+        db.Index('idx_connections_cluster_id_id', 'cluster_id', 'id'),  # Keyset pagination per cluster
+        {'schema': 'workboard'}
+    )
 
     id = db.Column(UUID, primary_key=True, default=uuid.uuid4)
     cluster_id = db.Column(UUID, db.ForeignKey('workboard.clusters.id', ondelete='CASCADE'))
@@ -17,10 +26,20 @@ class Connection(db.Model):
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
 
-    def update_from_netbox(self, data):
-        """Update connection from Netbox data"""
-        # Store metadata
-        self.meta_data = {
+    @classmethod
+    def query_with_devices(cls):
+        """Query connections with both endpoint device names joined in the same SELECT"""
+        from .device import Device  # Import here to avoid circular dependency
+
+        return cls.query.options(
+            joinedload(cls.device_a).load_only(Device.name),
+            joinedload(cls.device_b).load_only(Device.name)
+        )
+
+    @staticmethod
+    def netbox_meta_data(data):
+        """Connection metadata from a Netbox cable"""
+        return {
             'type': data.get('type'),
             'label': data.get('label', ''),
             'color': data.get('color', ''),
@@ -32,7 +51,10 @@ class Connection(db.Model):
             'last_updated': data.get('last_updated'),
             'status': data.get('status', {}).get('value')
         }
-        
+
+    def update_from_netbox(self, data):
+        """Update connection from Netbox data"""
+        self.meta_data = self.netbox_meta_data(data)
         db.session.add(self)
 
     def to_dict(self):
@@ -71,6 +93,8 @@ class Connection(db.Model):
         }
 
     def __repr__(self):
-        device_a_name = self.device_a.name if self.device_a else 'Unknown'
-        device_b_name = self.device_b.name if self.device_b else 'Unknown'
+        # Never trigger lazy loads from a repr; fall back to ids when devices aren't loaded
+        unloaded = inspect(self).unloaded
+        device_a_name = self.device_a.name if 'device_a' not in unloaded and self.device_a else self.device_a_id
+        device_b_name = self.device_b.name if 'device_b' not in unloaded and self.device_b else self.device_b_id
         return f'<Connection {device_a_name}:{self.interface_a} -> {device_b_name}:{self.interface_b}>'
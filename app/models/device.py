@@ -1,11 +1,30 @@
 from .. import db
 from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import deferred
 import uuid
 
+# Generated text columns searched through pg_trgm GIN indexes (see app.services.search)
+SEARCH_TEXT = "coalesce(name, '') || ' ' || coalesce(device_type, '') || ' ' || coalesce(meta_data->>'role', '')"
+INTERFACE_TEXT = "coalesce(jsonb_path_query_array(interfaces, '$[*].name')::text, '') || ' ' || " \
+                 "coalesce(jsonb_path_query_array(interfaces, '$[*].description')::text, '')"
+
 class Device(db.Model):
     """Device model representing a Netbox device"""
     __tablename__ = 'devices'
-    __table_args__ = {'schema': 'workboard'}
+    __table_args__ = (
+        db.Index('idx_devices_cluster_id', 'cluster_id'),
+        db.Index('idx_devices_name', 'name'),  # Connection resolution by device name
+        db.Index('idx_devices_interfaces_gin', 'interfaces', postgresql_using='gin'),
+        # Keyset pagination of /api/v1/devices, ordered by (name, id) under each filter
+        db.Index('idx_devices_name_id', 'name', 'id'),
+        db.Index('idx_devices_cluster_name_id', 'cluster_id', 'name', 'id'),
+        db.Index('idx_devices_role_name_id', db.text("(meta_data->>'role')"), 'name', 'id'),
+        db.Index('idx_devices_status_name_id', db.text("(meta_data->>'status')"), 'name', 'id'),
+        # Substring and similarity search of /api/v1/search
+        db.Index('idx_devices_search_text_trgm', 'search_text', postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'}),
+        db.Index('idx_devices_interface_text_trgm', 'interface_text', postgresql_using='gin', postgresql_ops={'interface_text': 'gin_trgm_ops'}),
+        {'schema': 'workboard'}
+    )
 
     id = db.Column(UUID, primary_key=True, default=uuid.uuid4)
     cluster_id = db.Column(UUID, db.ForeignKey('workboard.clusters.id', ondelete='CASCADE'))
@@ -15,6 +34,8 @@ class Device(db.Model):
     interfaces = db.Column(JSONB)
     position = db.Column(JSONB)  # For Cytoscape layout
     meta_data = db.Column(JSONB)
+    search_text = deferred(db.Column(db.Text, db.Computed(SEARCH_TEXT, persisted=True)))
+    interface_text = deferred(db.Column(db.Text, db.Computed(INTERFACE_TEXT, persisted=True)))
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
 
@@ -50,6 +71,8 @@ class Device(db.Model):
             'role': role_name,
             'role_color': role.color if role else None,  # Store color in metadata
             'status': data.get('status', {}).get('value'),
+            'site': (data.get('site') or {}).get('name'),  # Grouping keys for aggregated topology views
+            'rack': (data.get('rack') or {}).get('name'),
             'description': data.get('description', ''),
             'comments': data.get('comments', ''),
             'tags': data.get('tags', []),
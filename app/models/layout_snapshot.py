@@ -0,0 +1,81 @@
+from .. import db
+from sqlalchemy.dialects.postgresql import JSONB, UUID, insert
+import uuid
+
+class LayoutSnapshot(db.Model):
+    """Named arrangement of a cluster's devices stored as one row.
+
+    positions maps device id to a compact [x, y] pair, so saving or switching
+    a layout reads or writes a single row instead of every device.
+    """
+    __tablename__ = 'layout_snapshots'
+    __table_args__ = (
+        db.UniqueConstraint('cluster_id', 'name', name='uq_layout_snapshots_cluster_name'),
+        {'schema': 'workboard'}
+    )
+
+    id = db.Column(UUID, primary_key=True, default=uuid.uuid4)
+    cluster_id = db.Column(UUID, db.ForeignKey('workboard.clusters.id', ondelete='CASCADE'), nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    positions = db.Column(JSONB, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped on every save; part of the topology ETag
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
+
+    @staticmethod
+    def compact(positions):
+        """Convert {device_id: {'x': x, 'y': y}} to {device_id: [x, y]}"""
+        return {device_id: [round(position['x'], 1), round(position['y'], 1)] for device_id, position in positions.items()}
+
+    @classmethod
+    def save(cls, cluster_id, name, positions):
+        """Create or replace a snapshot with one upsert; returns the new version"""
+        stmt = insert(cls).values(id=uuid.uuid4(), cluster_id=str(cluster_id), name=name, positions=cls.compact(positions))
+        stmt = stmt.on_conflict_do_update(
+            constraint='uq_layout_snapshots_cluster_name',
+            set_={
+                'positions': stmt.excluded.positions,
+                'version': cls.version + 1,
+                'updated_at': db.func.current_timestamp()
+            }
+        ).returning(cls.version)
+        version = db.session.execute(stmt).scalar_one()
+        db.session.commit()
+        return version
+
+    @classmethod
+    def list_for(cls, cluster_id):
+        """Snapshot names and versions for a cluster, without their positions"""
+        return db.session.query(cls.id, cls.name, cls.version, cls.updated_at) \
+            .filter(cls.cluster_id == str(cluster_id)).order_by(cls.name).all()
+
+    @classmethod
+    def lookup(cls, cluster_id, name):
+        return cls.query.filter_by(cluster_id=str(cluster_id), name=name).first()
+
+    def etag_suffix(self):
+        """Identifies this snapshot revision inside a topology ETag"""
+        return f'{uuid.UUID(str(self.id)).hex[:12]}v{self.version}'
+
+    @staticmethod
+    def summary_to_dict(row):
+        return {
+            'id': str(row.id),
+            'name': row.name,
+            'version': row.version,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None
+        }
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'cluster_id': str(self.cluster_id),
+            'name': self.name,
+            'version': self.version,
+            'positions': dict(self.positions) if self.positions else {},
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<LayoutSnapshot {self.name} v{self.version}>'
@@ -1,7 +1,11 @@
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
 from werkzeug.security import generate_password_hash, check_password_hash
 from .. import db
 
+SETTINGS_CACHE_KEY = 'settings'
+
 class AppSettings(db.Model):
     """Application settings model"""
     __tablename__ = 'app_settings'
@@ -25,6 +29,25 @@ class AppSettings(db.Model):
             db.session.commit()
         return settings
     
+    @classmethod
+    def get_cached(cls):
+        """Get a read-only settings snapshot from the per-process cache"""
+        from ..cache import cache
+        return cache.get(SETTINGS_CACHE_KEY, lambda: cls.get_settings().snapshot())
+    
+    def snapshot(self):
+        """Detached copy for read-only use; changes to it are never persisted"""
+        return AppSettings(
+            id=self.id,
+            netbox_url=self.netbox_url,
+            _netbox_token=self._netbox_token,
+            sync_interval=self.sync_interval,
+            last_sync=self.last_sync,
+            is_connected=self.is_connected,
+            verify_ssl=self.verify_ssl,
+            timeout=self.timeout
+        )
+    
     @property
     def netbox_token(self):
         """Never expose the actual token"""
@@ -69,3 +92,10 @@ class AppSettings(db.Model):
         if include_token:
             data['netbox_token'] = self.netbox_token  # Returns masked version
         return data
+
+@event.listens_for(AppSettings, 'after_insert')
+@event.listens_for(AppSettings, 'after_update')
+def invalidate_cached_settings(mapper, connection, target):
+    """Drop cached settings in every process once the change commits"""
+    from ..cache import cache
+    cache.invalidate_on_commit(object_session(target), SETTINGS_CACHE_KEY)
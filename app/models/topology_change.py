@@ -0,0 +1,71 @@
+from .. import db
+from sqlalchemy import insert, delete, update
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+class TopologyChange(db.Model):
+    """Journal entry: one node or edge added, removed or modified at a cluster's topology version.
+
+    data holds the element (or, for layout moves, just its position) as of
+    that version; removals carry none. Entries older than the retention
+    window are pruned and Cluster.changes_since advanced past them.
+    """
+    __tablename__ = 'topology_changes'
+    __table_args__ = (
+        db.Index('idx_topology_changes_cluster_version', 'cluster_id', 'version', 'id'),
+        {'schema': 'workboard'}
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)  # Insertion order within a version
+    cluster_id = db.Column(UUID, db.ForeignKey('workboard.clusters.id', ondelete='CASCADE'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    element = db.Column(db.String(8), nullable=False)  # node | edge
+    op = db.Column(db.String(16), nullable=False)  # added | removed | modified
+    element_id = db.Column(db.String(64), nullable=False)  # Cytoscape element id
+    data = db.Column(JSONB)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.current_timestamp())
+
+    @classmethod
+    def record(cls, cluster_id, version, changes, keep=None):
+        """Insert (element, op, element_id, data) tuples for a version and prune what falls outside keep versions.
+
+        The caller commits, in the same transaction as the version bump.
+        """
+        from .cluster import Cluster  # Import here to avoid circular dependency
+
+        rows = [
+            {'cluster_id': str(cluster_id), 'version': version, 'element': element, 'op': op, 'element_id': element_id, 'data': data}
+            for element, op, element_id, data in changes
+        ]
+        if rows:
+            db.session.execute(insert(cls), rows)
+
+        if keep is not None and version > keep:
+            floor = version - keep
+            db.session.execute(
+                delete(cls).where(cls.cluster_id == str(cluster_id), cls.version <= floor)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.execute(
+                update(Cluster).where(Cluster.id == str(cluster_id), Cluster.changes_since < floor)
+                .values(changes_since=floor)
+                .execution_options(synchronize_session=False)
+            )
+        return len(rows)
+
+    @classmethod
+    def since(cls, cluster_id, version, until, limit):
+        """Entries after version up to until in order, at most limit + 1 so callers can tell when there are more"""
+        return cls.query.filter(cls.cluster_id == str(cluster_id), cls.version > version, cls.version <= until) \
+            .order_by(cls.version, cls.id).limit(limit + 1).all()
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'element': self.element,
+            'op': self.op,
+            'id': self.element_id,
+            'data': self.data
+        }
+
+    def __repr__(self):
+        return f'<TopologyChange v{self.version} {self.op} {self.element} {self.element_id}>'
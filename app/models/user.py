@@ -1,4 +1,6 @@
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
 from werkzeug.security import generate_password_hash, check_password_hash
 from .. import db
 
@@ -11,6 +13,21 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(255))  # Increased length to accommodate longer hashes
     is_admin = db.Column(db.Boolean, default=False)
     
+    @classmethod
+    def get_cached(cls, user_id):
+        """Get a read-only identity snapshot for Flask-Login from the per-process cache"""
+        from ..cache import cache
+        
+        def load():
+            user = db.session.get(cls, user_id)
+            return user.snapshot() if user else None
+        
+        return cache.get(f'user:{user_id}', load)
+    
+    def snapshot(self):
+        """Detached copy without the password hash; changes to it are never persisted"""
+        return User(id=self.id, username=self.username, is_admin=self.is_admin)
+    
     @property
     def password(self):
         raise AttributeError('password is not a readable attribute')
@@ -36,3 +53,10 @@ class User(UserMixin, db.Model):
             db.session.commit()
             return user
         return None
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    """Drop the cached identity in every process once the change commits"""
+    from ..cache import cache
+    cache.invalidate_on_commit(object_session(target), f'user:{target.id}')
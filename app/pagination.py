@@ -0,0 +1,81 @@
+import json
+import uuid
+import base64
+import binascii
+from flask import request, current_app
+from sqlalchemy import tuple_
+from sqlalchemy.types import Uuid
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def encode_cursor(values):
+    """Opaque cursor for the sort key of the last row on a page"""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    """Decode a cursor back into its sort key values"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+def column_values(columns, values):
+    """Cursor values checked against the sort columns (strings, UUID columns holding UUIDs)"""
+    if not all(isinstance(value, str) for value in values):
+        raise InvalidCursor('Invalid cursor')
+    try:
+        return [str(uuid.UUID(value)) if isinstance(column.type, Uuid) else value
+                for column, value in zip(columns, values)]
+    except ValueError as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+def page_limit():
+    """Page size from ?limit=, defaulting to PER_PAGE and capped at MAX_PER_PAGE"""
+    default = current_app.config.get('PER_PAGE', 20)
+    maximum = current_app.config.get('MAX_PER_PAGE', 1000)
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+def keyset_page(query, columns, to_dict):
+    """Return one page of query ordered by columns, continuing after ?cursor=.
+
+    columns must form a unique sort key (end with the primary key) so that
+    pages never overlap or skip rows. Each page costs one index range scan
+    regardless of how deep into the collection it is, unlike OFFSET.
+    """
+    limit = page_limit()
+    cursor = request.args.get('cursor')
+    if cursor:
+        values = column_values(columns, decode_cursor(cursor, len(columns)))
+        if len(columns) == 1:
+            query = query.filter(columns[0] > values[0])
+        else:
+            query = query.filter(tuple_(*columns) > tuple(values))
+
+    # One extra row tells us whether another page exists
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([str(getattr(last, column.key)) for column in columns])
+
+    return {
+        'status': 'success',
+        'data': [to_dict(row) for row in rows],
+        'pagination': {
+            'limit': limit,
+            'next_cursor': next_cursor
+        }
+    }
@@ -4,9 +4,14 @@ from flask import Blueprint
 bp = Blueprint('api_v1', __name__, url_prefix='/api/v1')
 
 # Import route modules
-from . import clusters, sync, settings
+from . import clusters, devices, connections, fabric, search, reports, sync, settings
 
 # Register route blueprints with their prefixes
 bp.register_blueprint(clusters.bp, url_prefix='/clusters')
+bp.register_blueprint(devices.bp, url_prefix='/devices')
+bp.register_blueprint(connections.bp, url_prefix='/connections')
+bp.register_blueprint(fabric.bp, url_prefix='/fabric')
+bp.register_blueprint(search.bp, url_prefix='/search')
+bp.register_blueprint(reports.bp, url_prefix='/reports')
 bp.register_blueprint(sync.bp, url_prefix='/sync')
 bp.register_blueprint(settings.bp, url_prefix='/settings')
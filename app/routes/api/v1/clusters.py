@@ -1,18 +1,32 @@
-from flask import Blueprint, jsonify, current_app
-from app.models import Cluster, Device, Connection, DeviceRole
+from flask import Blueprint, jsonify, request, current_app
+from app.models import Cluster, Device, Connection, DeviceRole, LayoutSnapshot
 from app.services.netbox import NetboxService
+from app.services.topology import topology_etag, not_modified, topology_response, requested_fields, requested_view, requested_snapshot
+from app.services.layout_buffer import clean_positions
+from app.database import read_replica, query_budget
+from app.events import events, for_cluster, status_event, event_response
+from app.services.export import requested_format, export_response, clusters_for_export
+from app.services.graph import graph_indexes, neighbors, shortest_path, impact
+from app.services.changes import changes_payload
+from app.services.batch import requested_batch, clusters_for_batch, batch_response
+from app import db, limiter
 
 # Create blueprint without url_prefix since it's handled by parent
 bp = Blueprint('api_v1_clusters', __name__)
 
 @bp.route('/')
+@read_replica
+@query_budget(1)
 def list_clusters():
-    """List all clusters from database"""
+    """List all clusters from database (pass ?detail=true to include metadata and layout)"""
     try:
-        clusters = Cluster.query.all()
+        if request.args.get('detail', 'false').lower() == 'true':
+            data = [cluster.to_dict() for cluster in Cluster.query.all()]
+        else:
+            data = [Cluster.summary_to_dict(row) for row in Cluster.summary_query()]
         return jsonify({
             'status': 'success',
-            'data': [cluster.to_dict() for cluster in clusters]
+            'data': data
         })
     except Exception as e:
         current_app.logger.error(f"Error listing clusters: {str(e)}")
@@ -22,62 +36,37 @@ def list_clusters():
         }), 500
 
 @bp.route('/<cluster_id>')
+@read_replica
+@query_budget(10)
 def get_cluster(cluster_id):
-    """Get cluster details including devices and connections"""
+    """Get cluster details including devices and connections (?profile=, ?fields=, ?group_by=, ?group=, ?layout=)"""
+    try:
+        selection = requested_fields()
+        view = requested_view()
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     try:
         # Look up by netbox_id instead of UUID
         cluster = Cluster.query.filter_by(netbox_id=cluster_id).first_or_404()
         
-        # Get all devices for this cluster
-        devices = Device.query.filter_by(cluster_id=cluster.id).all()
-        
-        # Get all connections for this cluster
-        connections = Connection.query.filter_by(cluster_id=cluster.id).all()
-        
-        # Format for Cytoscape.js
-        elements = {
-            'nodes': [
-                {
-                    'data': {
-                        'id': str(device.id),
-                        'label': device.name,
-                        'type': device.device_type,
-                        'interfaces': device.interfaces or [],
-                        'meta_data': dict(device.meta_data) if device.meta_data else {},
-                        'role': device.meta_data.get('role') if device.meta_data else None,
-                        'role_color': device.meta_data.get('role_color') if device.meta_data else None
-                    },
-                    'position': device.position or {'x': 0, 'y': 0}
-                }
-                for device in devices
-            ],
-            'edges': [
-                {
-                    'data': {
-                        'id': f'e{conn.id}',
-                        'source': str(conn.device_a_id),
-                        'target': str(conn.device_b_id),
-                        'sourceInterface': conn.interface_a,
-                        'targetInterface': conn.interface_b,
-                        'meta_data': dict(conn.meta_data) if conn.meta_data else {}
-                    }
-                }
-                for conn in connections
-            ]
-        }
+        try:
+            snapshot = requested_snapshot(cluster)
+        except LookupError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 404
         
-        # Convert cluster data
-        cluster_data = cluster.to_dict()
-        cluster_data['meta_data'] = dict(cluster.meta_data) if cluster.meta_data else {}
-        cluster_data['layout_data'] = dict(cluster.layout_data) if cluster.layout_data else {}
+        # Answer revalidations before touching devices or connections
+        etag = topology_etag(cluster, snapshot)
+        cached = not_modified(etag)
+        if cached:
+            return cached
         
-        return jsonify({
-            'status': 'success',
-            'data': {
-                'cluster': cluster_data,
-                'elements': elements
-            }
-        })
+        return topology_response(cluster, 'v1', etag, selection, view, snapshot)
     except Exception as e:
         current_app.logger.error(f"Error getting cluster {cluster_id}: {str(e)}")
         return jsonify({
@@ -156,3 +145,319 @@ def sync_cluster(cluster_id):
             'status': 'error',
             'message': str(e)
         }), 500
+
+@bp.route('/batch')
+@read_replica
+@query_budget(1)
+def batch_clusters():
+    """Stream the topologies of several clusters (?clusters=<netbox_id>,..., ?format=json|ndjson, ?profile=, ?fields=)"""
+    try:
+        ids, name = requested_batch(by='netbox_id')
+        selection = requested_fields()
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    try:
+        clusters, missing = clusters_for_batch(ids, by='netbox_id')
+        return batch_response(clusters, 'v1', name, missing, selection)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching cluster batch: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/export')
+@read_replica
+@query_budget(1)
+def export_clusters():
+    """Stream an export of several clusters (?clusters=<netbox_id>,...) or all of them (?format=, ?gzip=true)"""
+    try:
+        name = requested_format()
+        ids = [int(cluster_id) for cluster_id in request.args.get('clusters', '').split(',') if cluster_id]
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    try:
+        return export_response(clusters_for_export(ids, by='netbox_id'), name, 'clusters')
+    except Exception as e:
+        current_app.logger.error(f"Error exporting clusters: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/<int:cluster_id>/export')
+@read_replica
+@query_budget(1)
+def export_cluster(cluster_id):
+    """Stream an export of one cluster's devices and connections (?format=json|ndjson|yaml, ?gzip=true)"""
+    try:
+        name = requested_format()
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    try:
+        cluster = Cluster.query.filter_by(netbox_id=cluster_id).first()
+        if not cluster:
+            return jsonify({
+                'status': 'error',
+                'message': f'Cluster {cluster_id} not found'
+            }), 404
+        return export_response([cluster], name, f'cluster-{cluster_id}', single=True)
+    except Exception as e:
+        current_app.logger.error(f"Error exporting cluster {cluster_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/<int:cluster_id>/changes')
+@read_replica
+@query_budget(10)
+def get_changes(cluster_id):
+    """Get nodes and edges added, removed or modified since ?since=<topology version> (truncated means refetch)"""
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'since must be a topology version'
+        }), 400
+    try:
+        cluster = Cluster.query.filter_by(netbox_id=cluster_id).first()
+        if not cluster:
+            return jsonify({
+                'status': 'error',
+                'message': f'Cluster {cluster_id} not found'
+            }), 404
+        
+        return jsonify({
+            'status': 'success',
+            'data': changes_payload(cluster, since)
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting changes for cluster {cluster_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/<int:cluster_id>/analytics')
+@read_replica
+@query_budget(1)
+def get_analytics(cluster_id):
+    """Get structural metrics computed at the last sync: degrees, components, articulation points, bridges"""
+    try:
+        row = db.session.query(Cluster.analytics).filter(Cluster.netbox_id == cluster_id).first()
+        if row is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'Cluster {cluster_id} not found'
+            }), 404
+        if request.args.get('degrees', 'true').lower() != 'true' and row.analytics:
+            return jsonify({
+                'status': 'success',
+                'data': {key: value for key, value in row.analytics.items() if key != 'degree'}
+            })
+        return jsonify({
+            'status': 'success',
+            'data': row.analytics
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting analytics for cluster {cluster_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+def graph_query(cluster_id, query):
+    """Run query(index) against the cluster's cached graph index; unknown devices are 404s"""
+    try:
+        cluster = Cluster.query.filter_by(netbox_id=cluster_id).first()
+        if not cluster:
+            return jsonify({
+                'status': 'error',
+                'message': f'Cluster {cluster_id} not found'
+            }), 404
+        return jsonify({
+            'status': 'success',
+            'data': query(graph_indexes.get(cluster))
+        })
+    except KeyError as e:
+        return jsonify({
+            'status': 'error',
+            'message': e.args[0]
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        current_app.logger.error(f"Error querying graph of cluster {cluster_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/<int:cluster_id>/graph/neighbors')
+@read_replica
+@query_budget(3)
+def graph_neighbors(cluster_id):
+    """Devices within ?hops= (default 1) links of ?device= (id or name)"""
+    hops = request.args.get('hops', 1, type=int)
+    if not request.args.get('device') or hops < 1:
+        return jsonify({
+            'status': 'error',
+            'message': 'device and a positive hops are required'
+        }), 400
+    return graph_query(cluster_id, lambda index: neighbors(index, request.args['device'], hops))
+
+@bp.route('/<int:cluster_id>/graph/path')
+@read_replica
+@query_budget(3)
+def graph_path(cluster_id):
+    """Shortest path between ?from= and ?to= devices (ids or names)"""
+    if not request.args.get('from') or not request.args.get('to'):
+        return jsonify({
+            'status': 'error',
+            'message': 'from and to are required'
+        }), 400
+    return graph_query(cluster_id, lambda index: shortest_path(index, request.args['from'], request.args['to']))
+
+@bp.route('/<int:cluster_id>/graph/impact')
+@read_replica
+@query_budget(3)
+def graph_impact(cluster_id):
+    """Devices cut off if ?devices=<id-or-name>,... go down (optionally as seen from ?root=)"""
+    devices = [device for device in request.args.get('devices', '').split(',') if device]
+    if not devices:
+        return jsonify({
+            'status': 'error',
+            'message': 'devices is required'
+        }), 400
+    return graph_query(cluster_id, lambda index: impact(index, devices, request.args.get('root')))
+
+@bp.route('/<int:cluster_id>/events')
+@limiter.limit("60/hour")
+@read_replica
+@query_budget(1)
+def cluster_events(cluster_id):
+    """Stream sync progress and topology version events for a cluster (text/event-stream)"""
+    if not events.available:
+        return jsonify({
+            'status': 'error',
+            'message': 'Event stream unavailable'
+        }), 503
+    try:
+        cluster = Cluster.query.filter_by(netbox_id=cluster_id).first()
+        if not cluster:
+            return jsonify({
+                'status': 'error',
+                'message': f'Cluster {cluster_id} not found'
+            }), 404
+        return event_response(for_cluster(cluster), status_event(cluster))
+    except Exception as e:
+        current_app.logger.error(f"Error opening event stream for cluster {cluster_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/<cluster_id>/layouts', methods=['GET'])
+@read_replica
+@query_budget(2)
+def list_layouts(cluster_id):
+    """List a cluster's named layout snapshots (without positions)"""
+    try:
+        cluster = Cluster.query.filter_by(netbox_id=cluster_id).first_or_404()
+        return jsonify({
+            'status': 'success',
+            'data': [LayoutSnapshot.summary_to_dict(row) for row in LayoutSnapshot.list_for(cluster.id)]
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error listing layouts for cluster {cluster_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/<cluster_id>/layouts/<name>', methods=['GET'])
+@read_replica
+@query_budget(2)
+def get_layout(cluster_id, name):
+    """Get a layout snapshot with its compact positions"""
+    try:
+        cluster = Cluster.query.filter_by(netbox_id=cluster_id).first_or_404()
+        snapshot = LayoutSnapshot.lookup(cluster.id, name)
+        if snapshot is None:
+            return jsonify({
+                'status': 'error',
+                'message': f"Layout '{name}' not found"
+            }), 404
+        return jsonify({
+            'status': 'success',
+            'data': snapshot.to_dict()
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting layout {name} for cluster {cluster_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/<cluster_id>/layouts/<name>', methods=['PUT'])
+@query_budget(2)
+def save_layout(cluster_id, name):
+    """Create or replace a layout snapshot from {device_id: {x, y}}"""
+    try:
+        cluster = Cluster.query.filter_by(netbox_id=cluster_id).first_or_404()
+        positions = clean_positions(request.get_json(silent=True))
+        if not positions:
+            return jsonify({
+                'status': 'error',
+                'message': 'No positions provided'
+            }), 400
+        version = LayoutSnapshot.save(cluster.id, name, positions)
+        return jsonify({
+            'status': 'success',
+            'message': f"Layout '{name}' saved",
+            'data': {'name': name, 'version': version}
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error saving layout {name} for cluster {cluster_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/<cluster_id>/layouts/<name>', methods=['DELETE'])
+@query_budget(3)
+def delete_layout(cluster_id, name):
+    """Delete a layout snapshot"""
+    try:
+        cluster = Cluster.query.filter_by(netbox_id=cluster_id).first_or_404()
+        snapshot = LayoutSnapshot.lookup(cluster.id, name)
+        if snapshot is None:
+            return jsonify({
+                'status': 'error',
+                'message': f"Layout '{name}' not found"
+            }), 404
+        db.session.delete(snapshot)
+        db.session.commit()
+        return jsonify({
+            'status': 'success',
+            'message': f"Layout '{name}' deleted"
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error deleting layout {name} for cluster {cluster_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
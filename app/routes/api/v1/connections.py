@@ -0,0 +1,58 @@
+import uuid
+from flask import Blueprint, jsonify, request, current_app
+from sqlalchemy import or_
+from app.models import Cluster, Connection
+from app.pagination import keyset_page, InvalidCursor
+from app.database import read_replica, query_budget
+
+# Create blueprint without url_prefix since it's handled by parent
+bp = Blueprint('api_v1_connections', __name__)
+
+@bp.route('/')
+@read_replica
+@query_budget(1)
+def list_connections():
+    """List connections ordered by id, one keyset page at a time.
+
+    Filters: ?cluster=<netbox_id>, ?status=, ?device=<device uuid> (either
+    endpoint). Pass the returned pagination.next_cursor as ?cursor= to fetch
+    the next page.
+    """
+    try:
+        query = Connection.query_with_devices()
+        if request.args.get('cluster'):
+            netbox_id = request.args.get('cluster', type=int)
+            if netbox_id is None:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'cluster must be a Netbox cluster id'
+                }), 400
+            cluster_id = Cluster.query.with_entities(Cluster.id).filter_by(
+                netbox_id=netbox_id
+            ).scalar_subquery()
+            query = query.filter(Connection.cluster_id == cluster_id)
+        if request.args.get('status'):
+            query = query.filter(Connection.meta_data['status'].astext == request.args['status'])
+        if request.args.get('device'):
+            try:
+                device_id = str(uuid.UUID(request.args['device']))
+            except ValueError:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'device must be a device UUID'
+                }), 400
+            query = query.filter(or_(Connection.device_a_id == device_id,
+                                     Connection.device_b_id == device_id))
+
+        return jsonify(keyset_page(query, [Connection.id], Connection.to_dict))
+    except InvalidCursor as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        current_app.logger.error(f"Error listing connections: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
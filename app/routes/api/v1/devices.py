@@ -0,0 +1,79 @@
+import uuid
+from flask import Blueprint, jsonify, request, current_app
+from app.models import Cluster, Device
+from app.pagination import keyset_page, InvalidCursor
+from app.database import read_replica, query_budget
+
+# Create blueprint without url_prefix since it's handled by parent
+bp = Blueprint('api_v1_devices', __name__)
+
+@bp.route('/')
+@read_replica
+@query_budget(1)
+def list_devices():
+    """List devices ordered by name, one keyset page at a time.
+
+    Filters: ?cluster=<netbox_id>, ?role=, ?status=. Pass the returned
+    pagination.next_cursor as ?cursor= to fetch the next page.
+    """
+    try:
+        query = Device.query
+        if request.args.get('cluster'):
+            netbox_id = request.args.get('cluster', type=int)
+            if netbox_id is None:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'cluster must be a Netbox cluster id'
+                }), 400
+            cluster_id = Cluster.query.with_entities(Cluster.id).filter_by(
+                netbox_id=netbox_id
+            ).scalar_subquery()
+            query = query.filter(Device.cluster_id == cluster_id)
+        if request.args.get('role'):
+            query = query.filter(Device.meta_data['role'].astext == request.args['role'])
+        if request.args.get('status'):
+            query = query.filter(Device.meta_data['status'].astext == request.args['status'])
+
+        return jsonify(keyset_page(query, [Device.name, Device.id], Device.to_dict))
+    except InvalidCursor as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        current_app.logger.error(f"Error listing devices: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/<device_id>')
+@read_replica
+@query_budget(1)
+def get_device(device_id):
+    """Get full device details, including interfaces and metadata"""
+    try:
+        uuid.UUID(device_id)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': f'Device {device_id} not found'
+        }), 404
+
+    try:
+        device = Device.query.get(device_id)
+        if not device:
+            return jsonify({
+                'status': 'error',
+                'message': f'Device {device_id} not found'
+            }), 404
+        return jsonify({
+            'status': 'success',
+            'data': device.to_dict()
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting device {device_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
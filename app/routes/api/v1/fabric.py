@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify, request, current_app
+from app.services.fabric import fabric_response
+from app.database import read_replica
+
+# Create blueprint without url_prefix since it's handled by parent
+bp = Blueprint('api_v1_fabric', __name__)
+
+@bp.route('/')
+@read_replica
+def get_fabric():
+    """Get the whole-estate topology: one summary node per cluster and weighted inter-cluster edges.
+
+    Pass ?links=true to include every inter-cluster link. The body is
+    streamed as chunked JSON.
+    """
+    try:
+        return fabric_response(request.args.get('links', 'false').lower() == 'true', envelope=True)
+    except Exception as e:
+        current_app.logger.error(f"Error getting fabric topology: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify, request, current_app
+from app.services.reports import REPORTS, ReportsUnavailable, list_reports, run_report
+from app.database import read_replica, query_budget
+
+# Create blueprint without url_prefix since it's handled by parent
+bp = Blueprint('api_v1_reports', __name__)
+
+@bp.route('/')
+def get_reports():
+    """List the available aggregate reports"""
+    return jsonify({
+        'status': 'success',
+        'data': list_reports()
+    })
+
+@bp.route('/<name>')
+@read_replica
+@query_budget(1)
+def get_report(name):
+    """Run an aggregate report across all clusters or one (?cluster=<netbox_id>)"""
+    if name not in REPORTS:
+        return jsonify({
+            'status': 'error',
+            'message': f"Report '{name}' not found"
+        }), 404
+    cluster = request.args.get('cluster', type=int)
+    if request.args.get('cluster') and cluster is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'cluster must be a Netbox cluster id'
+        }), 400
+    try:
+        return jsonify({
+            'status': 'success',
+            'data': run_report(name, cluster)
+        })
+    except ReportsUnavailable as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 503
+    except Exception as e:
+        current_app.logger.error(f"Error running report {name}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
@@ -0,0 +1,32 @@
+from flask import Blueprint, jsonify, current_app
+from app.pagination import InvalidCursor
+from app.services.search import requested_search, search
+from app.database import read_replica, query_budget
+
+# Create blueprint without url_prefix since it's handled by parent
+bp = Blueprint('api_v1_search', __name__)
+
+@bp.route('/')
+@read_replica
+@query_budget(1)
+def search_devices():
+    """Search device names, types and roles and interface names and descriptions across all clusters.
+
+    ?q= (at least 3 characters), optional ?kind=device|interface and
+    ?cluster=<netbox_id>. Results are ranked by trigram similarity; pass the
+    returned pagination.next_cursor as ?cursor= for the next page.
+    """
+    try:
+        term, kinds, cluster = requested_search()
+        return jsonify(search(term, kinds, cluster))
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        current_app.logger.error(f"Error searching: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
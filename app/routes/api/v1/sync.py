@@ -1,7 +1,8 @@
 from flask import Blueprint, jsonify, current_app
 from app.models import AppSettings, Cluster
 from app.services import NetboxService
-from app.tasks.sync import perform_sync
+from app.tasks.sync import perform_sync, progress_publisher, schedule_after_sync
+from app.events import events
 from app import db
 
 # Create blueprint without url_prefix since it's handled by parent
@@ -70,16 +71,21 @@ def sync_cluster(cluster_id):
         # Mark sync as started
         cluster.sync_in_progress = True
         db.session.commit()
+        events.publish('sync_started', cluster)
         
         try:
             # Perform sync directly
             netbox = NetboxService()
-            netbox.sync_cluster(cluster.netbox_id)
+            netbox.sync_cluster(cluster.netbox_id, progress=progress_publisher())
             
             # Update sync status
             cluster.sync_in_progress = False
             cluster.last_sync = db.func.current_timestamp()
             db.session.commit()
+            # Layout, analytics and report refreshes are too slow for a request; the worker runs them
+            schedule_after_sync(cluster)
+            events.publish('sync_completed', cluster, last_sync=cluster.last_sync,
+                           topology_version=cluster.topology_version)
             
             return jsonify({
                 'status': 'success',
@@ -89,6 +95,7 @@ def sync_cluster(cluster_id):
             # Reset sync status on error
             cluster.sync_in_progress = False
             db.session.commit()
+            events.publish('sync_failed', cluster, message=str(e))
             raise
             
     except Exception as e:
@@ -1,16 +1,26 @@
 import json
+import uuid
 from flask import Blueprint, render_template, jsonify, request, current_app
 from flask_wtf.csrf import generate_csrf
-from ..models import Cluster, Device, Connection
+from sqlalchemy.orm import load_only
+from ..models import Cluster, Device, LayoutSnapshot
 from ..services import NetboxService, RabbitMQService
+from ..services.topology import topology_etag, not_modified, topology_response, requested_fields, requested_view, requested_snapshot
+from ..services.layout_buffer import clean_positions, buffer_positions
+from ..services.export import requested_format, export_response, clusters_for_export
+from ..services.fabric import fabric_response
+from ..services.batch import requested_batch, clusters_for_batch, batch_response
+from ..database import read_replica, query_budget
+from ..events import events, for_cluster, status_event, event_response
 from .. import db, csrf, limiter
 
 bp = Blueprint('main', __name__)
 
 @bp.route('/')
+@query_budget(1)
 def index():
     """Render main workboard page"""
-    clusters = Cluster.query.all()
+    clusters = Cluster.query.options(load_only(Cluster.id, Cluster.name)).order_by(Cluster.name).all()
     return render_template('index.html', clusters=clusters, csrf_token_value=generate_csrf())
 
 @bp.route('/clusters/<cluster_id>')
@@ -20,44 +30,88 @@ def view_cluster(cluster_id):
     return render_template('cluster.html', cluster=cluster, csrf_token_value=generate_csrf())
 
 @bp.route('/api/clusters')
+@read_replica
+@query_budget(1)
 def list_clusters():
-    """List all clusters"""
-    clusters = Cluster.query.all()
-    return jsonify([cluster.to_dict() for cluster in clusters])
+    """List all clusters (pass ?detail=true to include metadata and layout)"""
+    if request.args.get('detail', 'false').lower() == 'true':
+        clusters = Cluster.query.all()
+        return jsonify([cluster.to_dict() for cluster in clusters])
+    return jsonify([Cluster.summary_to_dict(row) for row in Cluster.summary_query()])
+
+@bp.route('/api/clusters/batch')
+@read_replica
+@query_budget(1)
+def batch_clusters():
+    """Stream the topologies of several clusters (?clusters=<id>,..., ?format=json|ndjson, ?profile=, ?fields=)"""
+    try:
+        ids, name = requested_batch()
+        selection = requested_fields()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        clusters, missing = clusters_for_batch(ids)
+        return batch_response(clusters, 'ui', name, missing, selection)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching cluster batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
 @bp.route('/api/clusters/<cluster_id>')
+@read_replica
+@query_budget(9)
 def get_cluster(cluster_id):
-    """Get cluster details including devices and connections"""
+    """Get cluster details including devices and connections (?profile=, ?fields=, ?group_by=, ?group=, ?layout=)"""
+    try:
+        selection = requested_fields()
+        view = requested_view()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     cluster = Cluster.query.get_or_404(cluster_id)
+    try:
+        snapshot = requested_snapshot(cluster)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
     
-    # Get all devices for this cluster
-    devices = Device.query.filter_by(cluster_id=cluster_id).all()
+    # Answer revalidations before touching devices or connections
+    etag = topology_etag(cluster, snapshot)
+    cached = not_modified(etag)
+    if cached:
+        return cached
     
-    # Get all connections for this cluster
-    connections = Connection.query.filter_by(cluster_id=cluster_id).all()
+    return topology_response(cluster, 'ui', etag, selection, view, snapshot)
+
+@bp.route('/api/clusters/<cluster_id>/analytics')
+@read_replica
+@query_budget(1)
+def get_analytics(cluster_id):
+    """Risk hotspots computed at the last sync (articulation points, bridges, components)"""
+    try:
+        uuid.UUID(cluster_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid cluster id'}), 404
     
-    # Format for Cytoscape.js
-    elements = {
-        'nodes': [
-            {
-                'data': {
-                    'id': str(device.id),
-                    'label': device.name,
-                    'type': device.device_type,
-                    'interfaces': list(device.interfaces) if device.interfaces else [],
-                    'metadata': dict(device.meta_data) if device.meta_data else {}
-                },
-                'position': device.position or {'x': 0, 'y': 0}
-            }
-            for device in devices
-        ],
-        'edges': [conn.to_cytoscape_edge() for conn in connections]
-    }
+    try:
+        row = db.session.query(Cluster.analytics).filter(Cluster.id == cluster_id).first()
+        if row is None:
+            return jsonify({'error': 'Cluster not found'}), 404
+        return jsonify(row.analytics or {})
+    except Exception as e:
+        current_app.logger.error(f"Error getting analytics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/devices/<device_id>')
+@read_replica
+@query_budget(1)
+def get_device(device_id):
+    """Get full device details (interfaces and metadata), loaded when a node is selected"""
+    try:
+        uuid.UUID(device_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid device id'}), 404
     
-    return jsonify({
-        'cluster': cluster.to_dict(),
-        'elements': elements
-    })
+    device = Device.query.get_or_404(device_id)
+    return jsonify(device.to_dict())
 
 @bp.route('/api/clusters/<cluster_id>/sync', methods=['POST'])
 def sync_cluster(cluster_id):
@@ -74,6 +128,7 @@ def sync_cluster(cluster_id):
         if rabbitmq.schedule_sync(int(cluster_id)):
             cluster.sync_in_progress = True
             db.session.commit()
+            events.publish('sync_scheduled', cluster)
             return jsonify({'status': 'sync scheduled'})
         return jsonify({'error': 'failed to schedule sync'}), 500
     except Exception as e:
@@ -82,6 +137,7 @@ def sync_cluster(cluster_id):
 
 @bp.route('/api/clusters/<cluster_id>/sync/status', methods=['GET'])
 @limiter.limit("60/minute")  # Increased rate limit for status checks
+@query_budget(1)
 def get_sync_status(cluster_id):
     """Get cluster sync status"""
     try:
@@ -94,69 +150,144 @@ def get_sync_status(cluster_id):
         current_app.logger.error(f"Error getting sync status: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/clusters/<cluster_id>/events', methods=['GET'])
+@limiter.limit("60/hour")  # Streams stay open for EVENTS_MAX_AGE seconds between reconnects
+@read_replica
+@query_budget(1)
+def cluster_events(cluster_id):
+    """Stream cluster sync and topology events as Server-Sent Events.
+
+    The browser falls back to polling /sync/status when this returns an error.
+    """
+    if not events.available:
+        return jsonify({'error': 'Event stream unavailable'}), 503
+    try:
+        uuid.UUID(cluster_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid cluster id'}), 404
+    
+    try:
+        cluster = Cluster.query.get(cluster_id)
+        if not cluster:
+            return jsonify({'error': 'Cluster not found'}), 404
+        return event_response(for_cluster(cluster), status_event(cluster))
+    except Exception as e:
+        current_app.logger.error(f"Error opening event stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/api/clusters/<cluster_id>/layout', methods=['POST'])
 @csrf.exempt  # Exempt this endpoint since it's called frequently
+@query_budget(2)
 def save_layout(cluster_id):
-    """Save Cytoscape layout positions"""
+    """Save Cytoscape layout positions.
+
+    Positions go to the write-behind buffer, which coalesces repeated moves and
+    is flushed in batches by the worker.
+    """
     try:
-        cluster = Cluster.query.get_or_404(cluster_id)
-        layout_data = request.json
-        
-        # Update device positions
-        for node_id, position in layout_data.items():
-            device = Device.query.get(node_id)
-            if device and device.cluster_id == cluster.id:
-                device.position = position
-        
-        db.session.commit()
+        uuid.UUID(cluster_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid cluster id'}), 404
+    
+    try:
+        if db.session.query(Cluster.id).filter_by(id=cluster_id).first() is None:
+            return jsonify({'error': 'Cluster not found'}), 404
+        buffer_positions(cluster_id, clean_positions(request.get_json(silent=True)))
         return jsonify({'status': 'layout saved'})
     except Exception as e:
         current_app.logger.error(f"Error saving layout: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/clusters/<cluster_id>/layouts', methods=['GET'])
+@read_replica
+@query_budget(2)
+def list_layouts(cluster_id):
+    """List a cluster's named layout snapshots (without positions)"""
+    cluster = Cluster.query.get_or_404(cluster_id)
+    return jsonify([LayoutSnapshot.summary_to_dict(row) for row in LayoutSnapshot.list_for(cluster.id)])
+
+@bp.route('/api/clusters/<cluster_id>/layouts/<name>', methods=['GET'])
+@read_replica
+@query_budget(2)
+def get_layout(cluster_id, name):
+    """Get a layout snapshot with its positions"""
+    cluster = Cluster.query.get_or_404(cluster_id)
+    snapshot = LayoutSnapshot.lookup(cluster.id, name)
+    if snapshot is None:
+        return jsonify({'error': f"Layout '{name}' not found"}), 404
+    return jsonify(snapshot.to_dict())
+
+@bp.route('/api/clusters/<cluster_id>/layouts/<name>', methods=['PUT'])
+@query_budget(2)
+def save_layout_snapshot(cluster_id, name):
+    """Create or replace a layout snapshot from {device_id: {x, y}} in one row write"""
+    try:
+        cluster = Cluster.query.get_or_404(cluster_id)
+        positions = clean_positions(request.get_json(silent=True))
+        if not positions:
+            return jsonify({'error': 'No positions provided'}), 400
+        version = LayoutSnapshot.save(cluster.id, name, positions)
+        return jsonify({'status': 'layout saved', 'name': name, 'version': version})
+    except Exception as e:
+        current_app.logger.error(f"Error saving layout snapshot {name}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/clusters/<cluster_id>/layouts/<name>', methods=['DELETE'])
+@query_budget(3)
+def delete_layout_snapshot(cluster_id, name):
+    """Delete a layout snapshot"""
+    cluster = Cluster.query.get_or_404(cluster_id)
+    snapshot = LayoutSnapshot.lookup(cluster.id, name)
+    if snapshot is None:
+        return jsonify({'error': f"Layout '{name}' not found"}), 404
+    db.session.delete(snapshot)
+    db.session.commit()
+    return jsonify({'status': 'layout deleted'})
+
 @bp.route('/api/clusters/<cluster_id>/export', methods=['GET'])
+@read_replica
+@query_budget(1)
 def export_cluster(cluster_id):
-    """Export cluster as YAML"""
+    """Export a cluster as JSON, NDJSON or YAML (?format=, ?gzip=true), streamed"""
+    try:
+        name = requested_format()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
         cluster = Cluster.query.get_or_404(cluster_id)
-        devices = Device.query.filter_by(cluster_id=cluster_id).all()
-        connections = Connection.query.filter_by(cluster_id=cluster_id).all()
-        
-        # Build export data structure
-        export_data = {
-            'cluster': {
-                'name': cluster.name,
-                'type': cluster.type,
-                'netbox_id': cluster.netbox_id,
-                'metadata': dict(cluster.meta_data) if cluster.meta_data else {}
-            },
-            'devices': [
-                {
-                    'name': device.name,
-                    'type': device.device_type,
-                    'netbox_id': device.netbox_id,
-                    'interfaces': list(device.interfaces) if device.interfaces else [],
-                    'metadata': dict(device.meta_data) if device.meta_data else {}
-                }
-                for device in devices
-            ],
-            'connections': [
-                {
-                    'device_a': conn.device_a.name,
-                    'device_b': conn.device_b.name,
-                    'interface_a': conn.interface_a,
-                    'interface_b': conn.interface_b,
-                    'metadata': dict(conn.meta_data) if conn.meta_data else {}
-                }
-                for conn in connections
-            ]
-        }
-        
-        return jsonify(export_data)
+        return export_response([cluster], name, f'cluster-{cluster.netbox_id}', single=True)
     except Exception as e:
         current_app.logger.error(f"Error exporting cluster: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/export', methods=['GET'])
+@read_replica
+@query_budget(1)
+def export_clusters():
+    """Export several clusters (?clusters=<id>,<id>) or the whole estate as one streamed archive"""
+    try:
+        name = requested_format()
+        ids = [cluster_id for cluster_id in request.args.get('clusters', '').split(',') if cluster_id]
+        for cluster_id in ids:
+            uuid.UUID(cluster_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        return export_response(clusters_for_export(ids), name, 'clusters')
+    except Exception as e:
+        current_app.logger.error(f"Error exporting clusters: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/fabric', methods=['GET'])
+@read_replica
+def get_fabric():
+    """Topology across all clusters: cluster summary nodes and inter-cluster edges (?links=true for every link)"""
+    try:
+        return fabric_response(request.args.get('links', 'false').lower() == 'true')
+    except Exception as e:
+        current_app.logger.error(f"Error getting fabric topology: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/api/netbox/sync', methods=['POST'])
 def sync_from_netbox():
     """Sync all clusters from Netbox"""
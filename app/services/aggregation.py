@@ -0,0 +1,127 @@
+from sqlalchemy import func, case, Float
+from sqlalchemy.orm import aliased, defer
+from .. import db
+from ..models import Device, Connection
+
+# Device meta_data keys a topology can be grouped by
+GROUP_BY_FIELDS = ('role', 'rack', 'site')
+
+# Group value for devices without the grouping attribute
+UNGROUPED = '(none)'
+
+def group_expr(entity, group_by):
+    """SQL expression for a device's group value"""
+    return func.coalesce(entity.meta_data[group_by].astext, UNGROUPED)
+
+def group_node_id(value):
+    return f'group:{value}'
+
+def group_summaries(cluster, group_by):
+    """One row per group: device count, role colour and mean position of its members"""
+    key = group_expr(Device, group_by)
+    return db.session.query(
+        key.label('value'),
+        func.count(Device.id).label('device_count'),
+        func.max(Device.meta_data['role_color'].astext).label('role_color'),
+        func.avg(Device.position['x'].astext.cast(Float)).label('x'),
+        func.avg(Device.position['y'].astext.cast(Float)).label('y')
+    ).filter(Device.cluster_id == cluster.id).group_by(key).order_by(key).all()
+
+def with_endpoints(query, cluster, device_a, device_b):
+    """Select from a cluster's connections joined to both endpoint devices"""
+    return query.select_from(Connection) \
+        .join(device_a, Connection.device_a_id == device_a.id) \
+        .join(device_b, Connection.device_b_id == device_b.id) \
+        .filter(Connection.cluster_id == cluster.id)
+
+def group_links(cluster, group_by):
+    """Connection counts between each unordered pair of groups (equal values are intra-group)"""
+    device_a, device_b = aliased(Device), aliased(Device)
+    group_a, group_b = group_expr(device_a, group_by), group_expr(device_b, group_by)
+    low, high = func.least(group_a, group_b), func.greatest(group_a, group_b)
+    query = db.session.query(low.label('source'), high.label('target'), func.count(Connection.id).label('weight'))
+    return with_endpoints(query, cluster, device_a, device_b).group_by(low, high).all()
+
+def summary_node(row, internal_links=0):
+    """Cytoscape node standing in for every device of a group"""
+    return {
+        'data': {
+            'id': group_node_id(row.value),
+            'label': f'{row.value} ({row.device_count})',
+            'group': row.value,
+            'device_count': row.device_count,
+            'internal_links': internal_links,
+            'role_color': row.role_color
+        },
+        'position': {'x': row.x or 0, 'y': row.y or 0}
+    }
+
+def weighted_edge(source, target, weight):
+    """Cytoscape edge collapsing every parallel connection between two endpoints"""
+    return {
+        'data': {
+            'id': f'{source}|{target}',
+            'source': source,
+            'target': target,
+            'weight': weight
+        }
+    }
+
+def aggregate_elements(cluster, group_by, group=None, node=None, edge=None, selection=None):
+    """Cytoscape elements for a cluster grouped by a device attribute.
+
+    Each group becomes one summary node and the connections between two groups
+    become one edge weighted by their count. When group is given, that group
+    is expanded into a compound node holding its devices (serialized with
+    node/edge), and its links to other groups are collapsed per device.
+    """
+    selection = selection or {}
+    internal = {}
+    edges = []
+    for link in group_links(cluster, group_by):
+        if link.source == link.target:
+            internal[link.source] = link.weight
+        elif group not in (link.source, link.target):
+            edges.append(weighted_edge(group_node_id(link.source), group_node_id(link.target), link.weight))
+
+    nodes = []
+    for row in group_summaries(cluster, group_by):
+        if row.value == group:
+            expanded = summary_node(row, internal.get(row.value, 0))
+            expanded['data']['expanded'] = True
+            del expanded['position']  # Cytoscape derives compound positions from children
+            nodes.append(expanded)
+        else:
+            nodes.append(summary_node(row, internal.get(row.value, 0)))
+
+    if group is None:
+        return {'nodes': nodes, 'edges': edges}
+
+    parent = group_node_id(group)
+    node_fields = selection.get('nodes')
+    query = Device.query.filter(Device.cluster_id == cluster.id, group_expr(Device, group_by) == group)
+    if node_fields is not None and 'interfaces' not in node_fields:
+        query = query.options(defer(Device.interfaces))
+    for device in query.order_by(Device.name).all():
+        child = node(device, node_fields)
+        child['data']['parent'] = parent
+        nodes.append(child)
+
+    device_a, device_b = aliased(Device), aliased(Device)
+    group_a, group_b = group_expr(device_a, group_by), group_expr(device_b, group_by)
+
+    # Connections inside the expanded group stay individual
+    inside = with_endpoints(db.session.query(Connection), cluster, device_a, device_b) \
+        .filter(group_a == group, group_b == group).all()
+    edges.extend(edge(conn, selection.get('edges')) for conn in inside)
+
+    # Connections leaving it are collapsed per (member device, other group)
+    member = case((group_a == group, device_a.id), else_=device_b.id)
+    other = case((group_a == group, group_b), else_=group_a)
+    query = db.session.query(member.label('device_id'), other.label('other'), func.count(Connection.id).label('weight'))
+    outside = with_endpoints(query, cluster, device_a, device_b) \
+        .filter(group_a != group_b, (group_a == group) | (group_b == group)) \
+        .group_by(member, other).all()
+    edges.extend(weighted_edge(str(row.device_id), group_node_id(row.other), row.weight) for row in outside)
+
+    return {'nodes': nodes, 'edges': edges}
@@ -0,0 +1,103 @@
+import uuid
+from itertools import groupby
+from operator import attrgetter
+from flask import Response, request, current_app, stream_with_context
+from sqlalchemy.orm import defer
+from ..models import Cluster, Device, Connection
+from .export import EXPORT_BATCH_SIZE
+from .topology import ui_node, v1_node, ui_edge, v1_edge, wants, build_payload
+
+# Batch format -> mimetype; ndjson puts each cluster on its own line
+BATCH_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+def requested_batch(by='id'):
+    """Parse ?clusters= (Cluster ids, or Netbox ids with by='netbox_id') and ?format=; raises ValueError"""
+    ids = [cluster_id.strip() for cluster_id in request.args.get('clusters', '').split(',') if cluster_id.strip()]
+    if not ids:
+        raise ValueError('clusters is required')
+    limit = current_app.config.get('BATCH_MAX_CLUSTERS', 50)
+    if len(ids) > limit:
+        raise ValueError(f'At most {limit} clusters can be fetched at once')
+    ids = [int(cluster_id) if by == 'netbox_id' else str(uuid.UUID(cluster_id)) for cluster_id in ids]
+
+    name = request.args.get('format', 'json').lower()
+    if name not in BATCH_FORMATS:
+        raise ValueError(f"Unknown batch format '{name}' (expected {', '.join(BATCH_FORMATS)})")
+    return list(dict.fromkeys(ids)), name
+
+def clusters_for_batch(ids, by='id'):
+    """Requested clusters in id order (the order their devices are read in) and the ids not found"""
+    column = Cluster.id if by == 'id' else Cluster.netbox_id
+    clusters = Cluster.query.filter(column.in_(ids)).order_by(Cluster.id).all()
+    found = {str(cluster.id) if by == 'id' else cluster.netbox_id for cluster in clusters}
+    return clusters, [cluster_id for cluster_id in ids if cluster_id not in found]
+
+class GroupCursor:
+    """Rows ordered by key, handed out one group at a time for keys requested in the same order"""
+
+    def __init__(self, rows, key):
+        self._groups = groupby(rows, key)
+        self._current = next(self._groups, None)
+
+    def take(self, key):
+        """Rows of the group for key, or none if the rows have no such group"""
+        if self._current is None or self._current[0] != key:
+            return []
+        rows = list(self._current[1])
+        self._current = next(self._groups, None)
+        return rows
+
+def batch_topologies(clusters, flavor, selection=None):
+    """Topology payload per cluster.
+
+    Devices and connections of every cluster are read with one query per
+    table from server-side cursors ordered by cluster, so each payload is
+    complete as soon as its cluster's rows have been read.
+    """
+    selection = selection or {}
+    node = ui_node if flavor == 'ui' else v1_node
+    edge = ui_edge if flavor == 'ui' else v1_edge
+    node_fields, edge_fields = selection.get('nodes'), selection.get('edges')
+    ids = [cluster.id for cluster in clusters]
+
+    devices = Device.query.filter(Device.cluster_id.in_(ids)).order_by(Device.cluster_id, Device.name)
+    if not wants(node_fields, 'interfaces'):
+        devices = devices.options(defer(Device.interfaces))
+    devices = GroupCursor(devices.yield_per(EXPORT_BATCH_SIZE), attrgetter('cluster_id'))
+    connections = GroupCursor(
+        Connection.query.filter(Connection.cluster_id.in_(ids))
+        .order_by(Connection.cluster_id, Connection.id).yield_per(EXPORT_BATCH_SIZE),
+        attrgetter('cluster_id')
+    )
+
+    for cluster in clusters:
+        elements = {
+            'nodes': [node(device, node_fields) for device in devices.take(cluster.id)],
+            'edges': [edge(conn, edge_fields) for conn in connections.take(cluster.id)]
+        }
+        payload = build_payload(cluster, flavor, elements)
+        yield payload.get('data', payload)
+
+def batch_json(payloads, missing, envelope=False):
+    """One JSON document listing the payloads, written a cluster at a time"""
+    yield '{"status": "success", "data": [' if envelope else '{"clusters": ['
+    for index, payload in enumerate(payloads):
+        yield (', ' if index else '') + current_app.json.dumps(payload)
+    yield '], "missing": ' + current_app.json.dumps(missing) + '}'
+
+def batch_ndjson(payloads, missing):
+    """One line per payload, then a {"missing": [...]} line with the ids not found"""
+    for payload in payloads:
+        yield current_app.json.dumps(payload) + '\n'
+    yield current_app.json.dumps({'missing': missing}) + '\n'
+
+def batch_response(clusters, flavor, name, missing, selection=None):
+    """Stream the clusters' topologies, one chunk per cluster; the request context stays open for the cursor reads"""
+    payloads = batch_topologies(clusters, flavor, selection)
+    body = batch_ndjson(payloads, missing) if name == 'ndjson' else batch_json(payloads, missing, envelope=flavor == 'v1')
+    return Response(stream_with_context(piece.encode() for piece in body), mimetype=BATCH_FORMATS[name], headers={
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,50 @@
+from flask import current_app
+from .. import db
+from ..models import TopologyChange
+from .topology import v1_node, v1_edge
+
+def node_change(op, device):
+    """Journal entry for a device; removals carry no data"""
+    return ('node', op, str(device.id), v1_node(device) if op != 'removed' else None)
+
+def edge_change(op, connection):
+    """Journal entry for a connection; removals carry no data"""
+    return ('edge', op, f'e{connection.id}', v1_edge(connection) if op != 'removed' else None)
+
+def position_change(device_id, position):
+    """Journal entry for a layout move; only the position is recorded"""
+    return ('node', 'modified', str(device_id), {'position': position})
+
+def record_changes(cluster_id, version, changes):
+    """Journal changes at version, pruning entries outside CHANGES_RETAIN_VERSIONS; the caller commits"""
+    return TopologyChange.record(cluster_id, version, changes, current_app.config.get('CHANGES_RETAIN_VERSIONS', 200))
+
+def bump_and_record(cluster, changes):
+    """Bump a cluster's topology version and journal changes against the new version; the caller commits"""
+    cluster.bump_topology_version()
+    db.session.flush()
+    record_changes(cluster.id, cluster.topology_version, changes)
+
+def changes_payload(cluster, since):
+    """Journal entries taking a client from version since to the cluster's current version.
+
+    truncated means the journal cannot do that (entries pruned or recorded
+    before the journal existed, more than CHANGES_MAX_ENTRIES of them, or a
+    since newer than the cluster) and the client should refetch the full
+    topology instead.
+    """
+    version = cluster.topology_version
+    data = {'since': since, 'version': version, 'truncated': False, 'changes': []}
+    if since < cluster.changes_since or since > version:
+        data['truncated'] = True
+        return data
+    if since == version:
+        return data
+
+    limit = current_app.config.get('CHANGES_MAX_ENTRIES', 5000)
+    entries = TopologyChange.since(cluster.id, since, version, limit)
+    if len(entries) > limit:
+        data['truncated'] = True
+        return data
+    data['changes'] = [entry.to_dict() for entry in entries]
+    return data
@@ -0,0 +1,110 @@
+import numpy as np
+from flask import request
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is optional
+    msgpack = None
+
+# Accept type selecting the columnar MessagePack encoding of topology payloads
+COLUMNAR_MIMETYPE = 'application/vnd.crumple.columnar+msgpack'
+COLUMNAR_VERSION = 1
+
+# String column entry for a missing or null value
+NULL_STRING = 0xFFFFFFFF
+
+def requested_encoding():
+    """'columnar' when the client prefers it to JSON (and msgpack is installed), else 'json'"""
+    if msgpack is None:
+        return 'json'
+    best = request.accept_mimetypes.best_match(['application/json', COLUMNAR_MIMETYPE])
+    return 'columnar' if best == COLUMNAR_MIMETYPE else 'json'
+
+def representation_etag(etag, encoding):
+    """ETag of one encoding of a payload; JSON keeps the plain ETag"""
+    return etag if encoding == 'json' else f'{etag}-{encoding}'
+
+class StringTable:
+    """Interned strings, each stored once and referenced by index"""
+
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def add(self, value):
+        if value is None:
+            return NULL_STRING
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def encode_column(values, strings):
+    """Strings as uint32 string table indices, numbers as float64 (NaN for null), anything else as is"""
+    if all(value is None or isinstance(value, str) for value in values):
+        return {'type': 'string', 'values': np.asarray([strings.add(value) for value in values], dtype='<u4').tobytes()}
+    if all(value is None or is_number(value) for value in values):
+        return {'type': 'number', 'values': np.asarray([np.nan if value is None else value for value in values], dtype='<f8').tobytes()}
+    return {'type': 'value', 'values': values}
+
+def encode_columns(rows, skip, strings):
+    """One column per data key seen in rows, in first-seen order"""
+    keys, seen = [], set(skip)
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen.add(key)
+                keys.append(key)
+    return {key: encode_column([row.get(key) for row in rows], strings) for key in keys}
+
+def columnar_elements(elements):
+    """Cytoscape elements as columns.
+
+    Node and edge ids and every string field go through one string table;
+    positions are an interleaved little-endian float64 [x, y] array (NaN for
+    nodes without one) and edge endpoints int32 node indices (-1 if the node
+    is not in the payload).
+    """
+    strings = StringTable()
+    nodes, edges = elements.get('nodes', []), elements.get('edges', [])
+    index_of = {node['data']['id']: index for index, node in enumerate(nodes)}
+
+    positions = np.full((len(nodes), 2), np.nan)
+    for index, node in enumerate(nodes):
+        position = node.get('position')
+        if position:
+            positions[index] = (position.get('x', 0), position.get('y', 0))
+
+    encoded = {
+        'format': 'columnar',
+        'version': COLUMNAR_VERSION,
+        'nodes': {
+            'count': len(nodes),
+            'id': np.asarray([strings.add(node['data']['id']) for node in nodes], dtype='<u4').tobytes(),
+            'position': positions.astype('<f8').tobytes(),
+            'data': encode_columns([node['data'] for node in nodes], ('id',), strings)
+        },
+        'edges': {
+            'count': len(edges),
+            'id': np.asarray([strings.add(edge['data']['id']) for edge in edges], dtype='<u4').tobytes(),
+            'source': np.asarray([index_of.get(edge['data']['source'], -1) for edge in edges], dtype='<i4').tobytes(),
+            'target': np.asarray([index_of.get(edge['data']['target'], -1) for edge in edges], dtype='<i4').tobytes(),
+            'data': encode_columns([edge['data'] for edge in edges], ('id', 'source', 'target'), strings)
+        }
+    }
+    encoded['strings'] = strings.strings
+    return encoded
+
+def columnar_payload(payload):
+    """MessagePack bytes of a topology payload with its elements in columnar form"""
+    target = payload['data'] if 'data' in payload else payload
+    target = {**target, 'elements': columnar_elements(target['elements'])}
+    if 'data' in payload:
+        payload = {**payload, 'data': target}
+    else:
+        payload = target
+    return msgpack.packb(payload, use_bin_type=True, default=str)
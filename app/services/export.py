@@ -0,0 +1,173 @@
+import json
+import zlib
+import yaml
+from flask import Response, request, current_app, stream_with_context
+from sqlalchemy.orm import aliased
+from .. import db
+from ..models import Cluster, Device, Connection
+
+# Export format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'json': ('application/json', 'json'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'yaml': ('application/x-yaml', 'yaml')
+}
+
+DEFAULT_FORMAT = 'json'
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Bytes of output collected before a chunk is sent
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def requested_format():
+    """Parse ?format= (json, ndjson or yaml); raises ValueError for anything else"""
+    name = request.args.get('format', DEFAULT_FORMAT).lower()
+    if name not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{name}' (expected {', '.join(EXPORT_FORMATS)})")
+    return name
+
+def requested_gzip():
+    return request.args.get('gzip', 'false').lower() == 'true'
+
+def cluster_record(cluster):
+    return {
+        'name': cluster.name,
+        'type': cluster.type,
+        'netbox_id': cluster.netbox_id,
+        'metadata': dict(cluster.meta_data) if cluster.meta_data else {}
+    }
+
+def device_records(cluster):
+    """A cluster's devices, read in batches from a server-side cursor"""
+    query = db.session.query(Device.name, Device.device_type, Device.netbox_id, Device.interfaces, Device.meta_data) \
+        .filter(Device.cluster_id == cluster.id).order_by(Device.name).yield_per(EXPORT_BATCH_SIZE)
+    for row in query:
+        yield {
+            'name': row.name,
+            'type': row.device_type,
+            'netbox_id': row.netbox_id,
+            'interfaces': list(row.interfaces) if row.interfaces else [],
+            'metadata': dict(row.meta_data) if row.meta_data else {}
+        }
+
+def connection_records(cluster):
+    """A cluster's connections with endpoint names joined in SQL rather than lazy-loaded"""
+    device_a, device_b = aliased(Device), aliased(Device)
+    query = db.session.query(
+        device_a.name.label('device_a'), device_b.name.label('device_b'),
+        Connection.interface_a, Connection.interface_b, Connection.meta_data
+    ).select_from(Connection) \
+        .join(device_a, Connection.device_a_id == device_a.id) \
+        .join(device_b, Connection.device_b_id == device_b.id) \
+        .filter(Connection.cluster_id == cluster.id) \
+        .order_by(Connection.id).yield_per(EXPORT_BATCH_SIZE)
+    for row in query:
+        yield {
+            'device_a': row.device_a,
+            'device_b': row.device_b,
+            'interface_a': row.interface_a,
+            'interface_b': row.interface_b,
+            'metadata': dict(row.meta_data) if row.meta_data else {}
+        }
+
+def json_cluster(cluster):
+    """One cluster as the {"cluster", "devices", "connections"} JSON object, piece by piece"""
+    yield '{"cluster": ' + json.dumps(cluster_record(cluster), default=str)
+    for key, records in (('devices', device_records(cluster)), ('connections', connection_records(cluster))):
+        yield f', "{key}": ['
+        for index, record in enumerate(records):
+            yield (', ' if index else '') + json.dumps(record, default=str)
+        yield ']'
+    yield '}'
+
+def json_export(clusters, single):
+    if single:
+        yield from json_cluster(clusters[0])
+        return
+    yield '{"clusters": ['
+    for index, cluster in enumerate(clusters):
+        if index:
+            yield ', '
+        yield from json_cluster(cluster)
+    yield ']}'
+
+def ndjson_export(clusters, single):
+    """One line per record, each tagged with its kind and cluster"""
+    for cluster in clusters:
+        yield json.dumps({'kind': 'cluster', **cluster_record(cluster)}, default=str) + '\n'
+        for kind, records in (('device', device_records(cluster)), ('connection', connection_records(cluster))):
+            for record in records:
+                yield json.dumps({'kind': kind, 'cluster': cluster.netbox_id, **record}, default=str) + '\n'
+
+def yaml_export(clusters, single):
+    """One YAML document per cluster; list items are dumped one at a time"""
+    for index, cluster in enumerate(clusters):
+        if index:
+            yield '---\n'
+        yield yaml.safe_dump({'cluster': cluster_record(cluster)}, sort_keys=False)
+        for key, records in (('devices', device_records(cluster)), ('connections', connection_records(cluster))):
+            empty = True
+            for record in records:
+                if empty:
+                    yield f'{key}:\n'
+                    empty = False
+                yield yaml.safe_dump([record], sort_keys=False, default_flow_style=False)
+            if empty:
+                yield f'{key}: []\n'
+
+EXPORTERS = {
+    'json': json_export,
+    'ndjson': ndjson_export,
+    'yaml': yaml_export
+}
+
+def chunked(pieces, size=EXPORT_CHUNK_SIZE):
+    """Join small text pieces into chunks of about size bytes"""
+    buffer, length = [], 0
+    for piece in pieces:
+        data = piece.encode()
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+def gzipped(chunks, level=6):
+    """Gzip a stream of chunks incrementally, flushing each so bytes go out as they are produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_stream(clusters, name, single=False, compress=False):
+    """Streamed export body with its mimetype and download filename.
+
+    Memory stays bounded by one cursor batch and one output chunk whatever the
+    size of the clusters; single exports one cluster as a bare object.
+    """
+    mimetype, extension = EXPORT_FORMATS[name]
+    body = chunked(EXPORTERS[name](clusters, single))
+    if compress:
+        return gzipped(body, current_app.config.get('COMPRESSION_GZIP_LEVEL', 6)), 'application/gzip', f'{extension}.gz'
+    return body, mimetype, extension
+
+def clusters_for_export(ids=None, by='id'):
+    """Clusters to export, in name order; ids filters by Cluster.id or Cluster.netbox_id"""
+    query = Cluster.query
+    if ids:
+        column = Cluster.id if by == 'id' else Cluster.netbox_id
+        query = query.filter(column.in_(ids))
+    return query.order_by(Cluster.name).all()
+
+def export_response(clusters, name, filename, single=False):
+    """Download response streaming the export; the request context stays open for the cursor reads"""
+    body, mimetype, extension = export_stream(clusters, name, single, requested_gzip())
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}.{extension}"'
+    })
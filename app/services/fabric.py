@@ -0,0 +1,80 @@
+import json
+from flask import Response, stream_with_context
+from sqlalchemy import func
+from .. import db
+from ..models import Cluster, Device, Connection, ClusterLink
+from .aggregation import weighted_edge
+from .export import chunked, EXPORT_BATCH_SIZE
+
+def cluster_node_id(cluster_id):
+    return f'cluster:{cluster_id}'
+
+def cluster_summaries():
+    """One row per cluster with its device and connection counts"""
+    devices = db.session.query(Device.cluster_id, func.count(Device.id).label('count')) \
+        .group_by(Device.cluster_id).subquery()
+    connections = db.session.query(Connection.cluster_id, func.count(Connection.id).label('count')) \
+        .group_by(Connection.cluster_id).subquery()
+    return db.session.query(
+        Cluster.id, Cluster.name, Cluster.netbox_id, Cluster.topology_version,
+        func.coalesce(devices.c.count, 0).label('device_count'),
+        func.coalesce(connections.c.count, 0).label('connection_count')
+    ).outerjoin(devices, devices.c.cluster_id == Cluster.id) \
+        .outerjoin(connections, connections.c.cluster_id == Cluster.id) \
+        .order_by(Cluster.name).all()
+
+def fabric_links():
+    """Inter-cluster link counts per unordered pair of clusters"""
+    low = func.least(ClusterLink.cluster_a_id, ClusterLink.cluster_b_id)
+    high = func.greatest(ClusterLink.cluster_a_id, ClusterLink.cluster_b_id)
+    return db.session.query(low.label('source'), high.label('target'), func.count(ClusterLink.id).label('weight')) \
+        .filter(ClusterLink.cluster_a_id.isnot(None), ClusterLink.cluster_b_id.isnot(None),
+                ClusterLink.cluster_a_id != ClusterLink.cluster_b_id) \
+        .group_by(low, high).all()
+
+def unresolved_links():
+    """Links whose far end belongs to a cluster that has not been synced yet"""
+    return db.session.query(func.count(ClusterLink.id)) \
+        .filter((ClusterLink.cluster_a_id.is_(None)) | (ClusterLink.cluster_b_id.is_(None))).scalar()
+
+def summary_node(row):
+    """Cytoscape node standing in for a whole cluster"""
+    return {
+        'data': {
+            'id': cluster_node_id(row.id),
+            'label': f'{row.name} ({row.device_count})',
+            'cluster_id': str(row.id),
+            'netbox_id': row.netbox_id,
+            'device_count': row.device_count,
+            'connection_count': row.connection_count,
+            'topology_version': row.topology_version
+        }
+    }
+
+def fabric_json(include_links=False, envelope=False):
+    """The fabric topology as JSON text pieces.
+
+    Summary nodes and weighted edges are small (one per cluster and per
+    cluster pair); individual links, when requested, are read from a
+    server-side cursor. envelope wraps the payload in the v1 status/data object.
+    """
+    yield '{"status": "success", "data": ' if envelope else ''
+    yield '{"elements": {"nodes": ['
+    for index, row in enumerate(cluster_summaries()):
+        yield (', ' if index else '') + json.dumps(summary_node(row), default=str)
+    yield '], "edges": ['
+    for index, row in enumerate(fabric_links()):
+        edge = weighted_edge(cluster_node_id(row.source), cluster_node_id(row.target), row.weight)
+        yield (', ' if index else '') + json.dumps(edge, default=str)
+    yield f']}}, "unresolved_links": {unresolved_links()}'
+    if include_links:
+        yield ', "links": ['
+        query = ClusterLink.query.order_by(ClusterLink.device_a_name, ClusterLink.interface_a).yield_per(EXPORT_BATCH_SIZE)
+        for index, link in enumerate(query):
+            yield (', ' if index else '') + json.dumps(link.to_dict(), default=str)
+        yield ']'
+    yield '}}' if envelope else '}'
+
+def fabric_response(include_links=False, envelope=False):
+    """Chunked JSON response; the request context stays open for the cursor reads"""
+    return Response(stream_with_context(chunked(fabric_json(include_links, envelope))), mimetype='application/json')
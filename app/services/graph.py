@@ -0,0 +1,298 @@
+import io
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+import redis
+from flask import current_app
+from .. import db
+from ..cache import cache
+from ..models import Device, Connection
+
+logger = logging.getLogger(__name__)
+
+# Redis key prefix for serialized indexes, followed by cluster id and graph digest
+GRAPH_CACHE_PREFIX = 'crumple:graph'
+
+class GraphIndex:
+    """Undirected device adjacency of one cluster in CSR form.
+
+    The neighbours of node i are indices[indptr[i]:indptr[i + 1]]; parallel
+    links are merged (multiplicity counts them) and self-loops dropped. Nodes
+    are looked up by device id or name.
+    """
+
+    def __init__(self, ids, names, indptr, indices, multiplicity=None):
+        self.ids = ids
+        self.names = names
+        self.indptr = indptr
+        self.indices = indices
+        self.multiplicity = multiplicity if multiplicity is not None else np.ones(len(indices), dtype=np.int32)
+        self._lookup = {name: index for index, name in enumerate(names.tolist())}
+        self._lookup.update((device_id, index) for index, device_id in enumerate(ids.tolist()))
+
+    @classmethod
+    def from_edges(cls, ids, names, edges):
+        """Build from node ids and names and an (m, 2) array of node index pairs"""
+        count = len(ids)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        source = np.concatenate([edges[:, 0], edges[:, 1]])
+        target = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.lexsort((target, source))
+        source, target = source[order], target[order]
+        unique = np.ones(len(source), dtype=bool)
+        unique[1:] = (source[1:] != source[:-1]) | (target[1:] != target[:-1])
+        multiplicity = np.diff(np.append(np.flatnonzero(unique), len(source))).astype(np.int32)
+        source, target = source[unique], target[unique]
+
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=count), out=indptr[1:])
+        return cls(np.asarray(ids, dtype=str), np.asarray(names, dtype=str), indptr, target.astype(np.int32), multiplicity)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def find(self, key):
+        """Node index of a device id or name; raises KeyError"""
+        try:
+            return self._lookup[key]
+        except KeyError:
+            raise KeyError(f"Device '{key}' not found in this cluster") from None
+
+    def device(self, index):
+        return {'id': str(self.ids[index]), 'name': str(self.names[index])}
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def expand(self, frontier):
+        """Neighbours of every frontier node, with the frontier node each was reached from"""
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        # Gather every CSR slice at once: offset within each slice plus its start
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.indices[np.repeat(starts, counts) + offsets], np.repeat(frontier, counts)
+
+    def bfs(self, start, max_hops=None, removed=None, target=None):
+        """Level-synchronous BFS; returns (distance, parent) arrays, -1 where unreached"""
+        distance = np.full(len(self), -1, dtype=np.int32)
+        parent = np.full(len(self), -1, dtype=np.int32)
+        blocked = np.zeros(len(self), dtype=bool)
+        if removed is not None:
+            blocked[removed] = True
+        distance[start] = 0
+        frontier = np.array([start])
+        hops = 0
+        while len(frontier) and (max_hops is None or hops < max_hops):
+            hops += 1
+            reached, via = self.expand(frontier)
+            fresh = (distance[reached] < 0) & ~blocked[reached]
+            reached, first = np.unique(reached[fresh], return_index=True)
+            distance[reached] = hops
+            parent[reached] = via[fresh][first]
+            if target is not None and distance[target] >= 0:
+                break
+            frontier = reached
+        return distance, parent
+
+    def components(self, removed=None):
+        """Connected component label per node (the smallest node index in it); removed nodes are -1"""
+        labels = np.arange(len(self))
+        source = np.repeat(labels, self.degrees())
+        target = self.indices
+        if removed is not None and len(removed):
+            keep = np.ones(len(self), dtype=bool)
+            keep[removed] = False
+            live = keep[source] & keep[target]
+            source, target = source[live], target[live]
+        # Min-label propagation with pointer jumping
+        while True:
+            updated = labels.copy()
+            np.minimum.at(updated, source, labels[target])
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+        if removed is not None and len(removed):
+            labels[removed] = -1
+        return labels
+
+    def digest(self):
+        """Content hash of the devices and links; unchanged by layout moves and re-syncs that change nothing"""
+        sha = hashlib.sha256()
+        for array in (self.ids, self.names, self.indptr, self.indices, self.multiplicity):
+            sha.update(np.ascontiguousarray(array).tobytes())
+        return sha.hexdigest()
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez(buffer, ids=self.ids, names=self.names, indptr=self.indptr, indices=self.indices, multiplicity=self.multiplicity)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        arrays = np.load(io.BytesIO(data), allow_pickle=False)
+        return cls(arrays['ids'], arrays['names'], arrays['indptr'], arrays['indices'],
+                   arrays['multiplicity'] if 'multiplicity' in arrays else None)
+
+def build_index(cluster):
+    """Read a cluster's devices and connections (two queries) into a GraphIndex"""
+    devices = db.session.query(Device.id, Device.name).filter(Device.cluster_id == cluster.id).order_by(Device.name, Device.id).all()
+    index_of = {device.id: index for index, device in enumerate(devices)}
+    links = db.session.query(Connection.device_a_id, Connection.device_b_id) \
+        .filter(Connection.cluster_id == cluster.id).all()
+    edges = np.array(
+        [(index_of[a], index_of[b]) for a, b in links if a in index_of and b in index_of],
+        dtype=np.int64
+    ).reshape(-1, 2)
+    return GraphIndex.from_edges(
+        [str(device.id) for device in devices],
+        [device.name or '' for device in devices],
+        edges
+    )
+
+class GraphIndexCache:
+    """Per-process LRU of graph indexes keyed by cluster and graph digest, backed by Redis.
+
+    The worker stores a fresh index after each sync and records its digest
+    on the cluster, so web processes load it from Redis instead of the
+    database. Layout moves leave the digest alone, so they keep the index;
+    a sync that changes devices or links clears it until the new index is
+    stored. Without a digest the topology version keys the index.
+    """
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(cluster):
+        content = cluster.graph_digest or f'v{cluster.topology_version}'
+        return f'{GRAPH_CACHE_PREFIX}:{cluster.id}:{content}'
+
+    def get(self, cluster):
+        key = self._key(cluster)
+        with self._lock:
+            index = self._local.get(key)
+            if index is not None:
+                self._local.move_to_end(key)
+                return index
+
+        index = self._redis_get(key)
+        if index is None:
+            return self.store(cluster)
+        self._remember(key, index)
+        return index
+
+    def store(self, cluster, index=None):
+        """Put a cluster's index (built if not given) in both cache levels"""
+        key = self._key(cluster)
+        index = index if index is not None else build_index(cluster)
+        if cache.redis is not None:
+            try:
+                cache.redis.set(key, index.to_bytes(), ex=current_app.config.get('TOPOLOGY_CACHE_TTL', 86400))
+            except redis.RedisError as e:
+                logger.warning(f"Failed to store graph index {key}: {str(e)}")
+        self._remember(key, index)
+        return index
+
+    def _redis_get(self, key):
+        if cache.redis is None:
+            return None
+        try:
+            data = cache.redis.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read graph index {key}: {str(e)}")
+            return None
+        return GraphIndex.from_bytes(data) if data is not None else None
+
+    def _remember(self, key, index):
+        with self._lock:
+            self._local[key] = index
+            self._local.move_to_end(key)
+            while len(self._local) > current_app.config.get('GRAPH_INDEX_LOCAL_ENTRIES', 16):
+                self._local.popitem(last=False)
+
+graph_indexes = GraphIndexCache()
+
+def warm_graph_index(cluster):
+    """Build and share a cluster's index and record its digest; called by the worker after sync.
+
+    Returns the index, or None if it could not be built.
+    """
+    if cluster is None:
+        return None
+    try:
+        index = build_index(cluster)
+        digest = index.digest()
+        if cluster.graph_digest != digest:
+            cluster.graph_digest = digest
+            db.session.commit()
+        return graph_indexes.store(cluster, index)
+    except Exception as e:
+        logger.warning(f"Failed to build graph index for cluster {cluster.id}: {str(e)}")
+        return None
+
+def neighbors(index, device, hops=1):
+    """Devices within hops links of device, nearest first"""
+    start = index.find(device)
+    distance, _ = index.bfs(start, max_hops=hops)
+    reached = np.flatnonzero(distance > 0)
+    reached = reached[np.argsort(distance[reached], kind='stable')]
+    return {
+        'device': index.device(start),
+        'hops': hops,
+        'neighbors': [{**index.device(node), 'distance': int(distance[node])} for node in reached]
+    }
+
+def shortest_path(index, source, target):
+    """Fewest-hop path between two devices; path is None when they are not connected"""
+    start, end = index.find(source), index.find(target)
+    distance, parent = index.bfs(start, target=end)
+    if distance[end] < 0:
+        return {'source': index.device(start), 'target': index.device(end), 'hops': None, 'path': None}
+    path = [end]
+    while path[-1] != start:
+        path.append(int(parent[path[-1]]))
+    return {
+        'source': index.device(start),
+        'target': index.device(end),
+        'hops': int(distance[end]),
+        'path': [index.device(node) for node in reversed(path)]
+    }
+
+def impact(index, devices, root=None):
+    """Devices that lose connectivity if the given devices go down.
+
+    With root, those are the devices reachable from root now but not after
+    the removal. Without it, every component containing a removed device is
+    split and everything outside the largest surviving piece is reported.
+    """
+    removed = np.array(sorted({index.find(device) for device in devices}), dtype=np.int64)
+    before = index.components()
+    after = index.components(removed)
+
+    if root is not None:
+        start = index.find(root)
+        if start in removed:
+            raise ValueError('The root device cannot be one of the removed devices')
+        lost = (before == before[start]) & (after != after[start])
+    else:
+        touched = np.isin(before, before[removed])
+        lost = np.zeros(len(index), dtype=bool)
+        for component in np.unique(before[removed]):
+            survivors = after[(before == component) & (after >= 0)]
+            if len(survivors):
+                largest = np.bincount(survivors).argmax()
+                lost |= (before == component) & (after >= 0) & (after != largest)
+        lost &= touched
+    lost[removed] = False
+
+    return {
+        'removed': [index.device(node) for node in removed],
+        'root': index.device(index.find(root)) if root is not None else None,
+        'disconnected': [index.device(node) for node in np.flatnonzero(lost)],
+        'components_before': int(len(np.unique(before))),
+        'components_after': int(len(np.unique(after[after >= 0])))
+    }
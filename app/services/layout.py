@@ -0,0 +1,139 @@
+import logging
+from datetime import datetime
+import numpy as np
+from flask import current_app
+from sqlalchemy import update
+from .. import db
+from ..models import Device, Connection
+from .changes import bump_and_record, position_change
+
+logger = logging.getLogger(__name__)
+
+# Name recorded in Cluster.layout_data for positions computed here
+LAYOUT_ALGORITHM = 'fruchterman_reingold'
+
+# Rows of the pairwise distance matrix computed at once; bounds memory to
+# LAYOUT_CHUNK x n instead of n x n for large clusters
+LAYOUT_CHUNK = 512
+
+def fruchterman_reingold(count, edges, positions, fixed, edge_length=150.0, iterations=100, seed=0):
+    """Vectorized Fruchterman-Reingold force-directed layout.
+
+    edges is an (m, 2) array of node indices, positions an (n, 2) array of
+    starting coordinates and fixed a boolean mask of nodes that must not move
+    (they still push and pull the others). Returns the new (n, 2) positions.
+    """
+    positions = positions.astype(float)
+    if count < 2 or fixed.all():
+        return positions
+
+    rng = np.random.default_rng(seed)
+    movable = ~fixed
+    k = float(edge_length)
+    temperature = k * np.sqrt(count) / 10
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        displacement = np.zeros_like(positions)
+
+        # Repulsion between every pair, k^2 / d along the unit vector, a block of rows
+        # at a time; float32 and in-place ops keep the n x n work memory-bound
+        x, y = positions[:, 0].astype(np.float32), positions[:, 1].astype(np.float32)
+        for start in range(0, count, LAYOUT_CHUNK):
+            rows = slice(start, start + LAYOUT_CHUNK)
+            dx = np.subtract.outer(x[rows], x)
+            dy = np.subtract.outer(y[rows], y)
+            factor = dx * dx
+            factor += dy * dy
+            # Clamp so coincident nodes (and each node with itself) never divide by zero
+            np.maximum(factor, 0.01, out=factor)
+            np.divide(k * k, factor, out=factor)
+            displacement[rows, 0] += np.einsum('ij,ij->i', dx, factor)
+            displacement[rows, 1] += np.einsum('ij,ij->i', dy, factor)
+
+        # Attraction along edges, d^2 / k
+        if len(edges):
+            delta = positions[edges[:, 0]] - positions[edges[:, 1]]
+            distance = np.maximum(np.linalg.norm(delta, axis=1), 0.01)
+            force = delta * (distance / k)[:, None]
+            np.subtract.at(displacement, edges[:, 0], force)
+            np.add.at(displacement, edges[:, 1], force)
+
+        # Weak gravity keeps disconnected components from drifting apart
+        displacement -= 0.05 * (positions - positions.mean(axis=0))
+
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 0.01)
+        step = displacement * (np.minimum(length, temperature) / length)[:, None]
+        step += rng.normal(scale=0.01, size=step.shape)
+        positions[movable] += step[movable]
+        temperature -= cooling
+
+    return positions
+
+def initial_positions(count, edges, positions, fixed, edge_length, seed=0):
+    """Seed unplaced nodes next to their placed neighbours, or on a disc otherwise"""
+    rng = np.random.default_rng(seed)
+    positions = positions.astype(float)
+    placed = fixed.copy()
+    radius = edge_length * np.sqrt(count)
+    center = positions[fixed].mean(axis=0) if fixed.any() else np.zeros(2)
+
+    for index in np.flatnonzero(~fixed):
+        neighbours = np.concatenate([edges[edges[:, 0] == index, 1], edges[edges[:, 1] == index, 0]])
+        neighbours = neighbours[placed[neighbours]]
+        if len(neighbours):
+            positions[index] = positions[neighbours].mean(axis=0) + rng.normal(scale=edge_length / 2, size=2)
+        else:
+            angle, distance = rng.uniform(0, 2 * np.pi), radius * np.sqrt(rng.uniform())
+            positions[index] = center + distance * np.array([np.cos(angle), np.sin(angle)])
+        placed[index] = True
+    return positions
+
+def layout_cluster(cluster):
+    """Compute positions for a cluster's devices that have none, keeping saved positions.
+
+    Returns the number of devices positioned. Positions are written with one
+    bulk UPDATE, the cluster's layout_data records how they were computed and
+    the topology version is bumped with the moves journaled; the caller commits.
+    """
+    devices = db.session.query(Device.id, Device.position).filter(Device.cluster_id == cluster.id).all()
+    missing = [index for index, device in enumerate(devices) if not device.position]
+    if not missing:
+        return 0
+
+    index_of = {device.id: index for index, device in enumerate(devices)}
+    links = db.session.query(Connection.device_a_id, Connection.device_b_id) \
+        .filter(Connection.cluster_id == cluster.id).all()
+    edges = np.array(
+        [(index_of[a], index_of[b]) for a, b in links if a in index_of and b in index_of and a != b],
+        dtype=int
+    ).reshape(-1, 2)
+
+    positions = np.array(
+        [(device.position.get('x', 0), device.position.get('y', 0)) if device.position else (0, 0) for device in devices],
+        dtype=float
+    )
+    fixed = np.ones(len(devices), dtype=bool)
+    fixed[missing] = False
+
+    edge_length = current_app.config.get('LAYOUT_EDGE_LENGTH', 150)
+    iterations = current_app.config.get('LAYOUT_ITERATIONS', 100)
+    positions = initial_positions(len(devices), edges, positions, fixed, edge_length)
+    positions = fruchterman_reingold(len(devices), edges, positions, fixed, edge_length, iterations)
+
+    placed = {
+        devices[index].id: {'x': round(float(positions[index, 0]), 1), 'y': round(float(positions[index, 1]), 1)}
+        for index in missing
+    }
+    db.session.execute(update(Device), [{'id': device_id, 'position': position} for device_id, position in placed.items()])
+
+    cluster.layout_data = {
+        **(cluster.layout_data or {}),
+        'algorithm': LAYOUT_ALGORITHM,
+        'computed_at': datetime.utcnow().isoformat(),
+        'positioned': len(missing),
+        'preserved': len(devices) - len(missing)
+    }
+    bump_and_record(cluster, [position_change(device_id, position) for device_id, position in placed.items()])
+    logger.info(f"Positioned {len(missing)} of {len(devices)} devices in cluster {cluster.netbox_id}")
+    return len(missing)
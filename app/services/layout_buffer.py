@@ -0,0 +1,167 @@
+import json
+import math
+import uuid
+import logging
+import redis
+from sqlalchemy import func, update, cast, bindparam
+from sqlalchemy.exc import DataError
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from .. import db
+from ..cache import cache
+from ..events import events
+from ..models import Cluster, Device
+from .changes import record_changes, position_change
+
+logger = logging.getLogger(__name__)
+
+# Redis hash per cluster of pending positions, field = device id
+PENDING_PREFIX = 'crumple:layout:pending'
+
+# Redis set of cluster ids with pending positions
+DIRTY_KEY = 'crumple:layout:dirty'
+
+def pending_key(cluster_id):
+    return f'{PENDING_PREFIX}:{cluster_id}'
+
+def clean_positions(data):
+    """Keep only {device_id: {'x': float, 'y': float}} entries with UUID keys and finite coordinates.
+
+    Device ids are normalized to the canonical UUID form, so one device maps
+    to one buffer field however the client spelled its id.
+    """
+    positions = {}
+    for device_id, position in (data or {}).items():
+        try:
+            x, y = float(position['x']), float(position['y'])
+            if math.isfinite(x) and math.isfinite(y):
+                positions[str(uuid.UUID(device_id))] = {'x': x, 'y': y}
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+    return positions
+
+def write_positions(cluster_id, positions):
+    """Apply positions with one set-based UPDATE, bump the cluster's topology version and journal the moves.
+
+    Device ids that do not belong to the cluster are ignored. Returns the
+    number of devices updated; the caller commits.
+    """
+    if not positions:
+        return 0
+
+    pending = func.jsonb_each(bindparam('positions', type_=JSONB)).table_valued('key', 'value').render_derived(name='pending')
+    moved = db.session.execute(
+        update(Device)
+        .where(Device.id == cast(pending.c.key, UUID), Device.cluster_id == str(cluster_id))
+        .values(position=pending.c.value, updated_at=func.now())
+        .returning(Device.id, pending.c.key)
+        .execution_options(synchronize_session=False),
+        {'positions': positions}
+    ).all()
+    if moved:
+        version = db.session.execute(
+            update(Cluster)
+            .where(Cluster.id == str(cluster_id))
+            .values(topology_version=Cluster.topology_version + 1)
+            .returning(Cluster.topology_version)
+        ).scalar()
+        # Positions are looked up by the key as buffered, which need not be the canonical UUID spelling
+        record_changes(cluster_id, version, [position_change(device_id, positions[key]) for device_id, key in moved])
+    return len(moved)
+
+def buffer_positions(cluster_id, positions):
+    """Queue positions for a later batched write; repeated moves of a node overwrite each other.
+
+    Without Redis the positions are written (and committed) immediately.
+    Returns True if they were buffered.
+    """
+    if not positions:
+        return True
+
+    if cache.redis is not None:
+        try:
+            pipe = cache.redis.pipeline()
+            pipe.hset(pending_key(cluster_id), mapping={
+                device_id: json.dumps(position) for device_id, position in positions.items()
+            })
+            pipe.sadd(DIRTY_KEY, str(cluster_id))
+            pipe.execute()
+            return True
+        except redis.RedisError as e:
+            logger.warning(f"Failed to buffer layout for cluster {cluster_id}, writing directly: {str(e)}")
+
+    write_positions(cluster_id, positions)
+    db.session.commit()
+    return False
+
+def decode_position(position):
+    try:
+        return json.loads(position)
+    except ValueError:
+        return None
+
+def flush_cluster(cluster_id):
+    """Write a cluster's pending positions to the database. Returns the number of devices updated."""
+    if cache.redis is None:
+        return 0
+
+    key = pending_key(cluster_id)
+    try:
+        # Take and clear the buffer atomically so concurrent moves land in the next flush
+        pipe = cache.redis.pipeline()
+        pipe.hgetall(key)
+        pipe.delete(key)
+        pending, _ = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Failed to read pending layout for cluster {cluster_id}: {str(e)}")
+        return 0
+    if not pending:
+        return 0
+
+    # Entries buffered before keys were validated are dropped here rather than failing every flush
+    positions = clean_positions({device_id.decode(): decode_position(position) for device_id, position in pending.items()})
+    if len(positions) < len(pending):
+        logger.warning(f"Dropped {len(pending) - len(positions)} invalid pending positions for cluster {cluster_id}")
+    try:
+        updated = write_positions(cluster_id, positions)
+        db.session.commit()
+    except DataError as e:
+        # Retrying cannot make these positions valid, so they are not put back
+        db.session.rollback()
+        logger.error(f"Dropped {len(positions)} pending positions for cluster {cluster_id} the database rejected: {str(e)}")
+        return 0
+    except Exception:
+        db.session.rollback()
+        # Put the positions back without overwriting moves buffered since
+        try:
+            pipe = cache.redis.pipeline()
+            for device_id, position in positions.items():
+                pipe.hsetnx(key, device_id, json.dumps(position))
+            pipe.sadd(DIRTY_KEY, str(cluster_id))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.error(f"Lost {len(positions)} pending positions for cluster {cluster_id}: {str(e)}")
+        raise
+
+    if updated:
+        events.publish('topology_changed', cluster_id=str(cluster_id), reason='layout', devices=updated)
+    return updated
+
+def flush_all():
+    """Flush every cluster with pending positions; called periodically by the worker"""
+    if cache.redis is None:
+        return 0
+
+    try:
+        cluster_ids = [cluster_id.decode() for cluster_id in cache.redis.smembers(DIRTY_KEY)]
+    except redis.RedisError as e:
+        logger.warning(f"Failed to list clusters with pending layout: {str(e)}")
+        return 0
+
+    updated = 0
+    for cluster_id in cluster_ids:
+        try:
+            cache.redis.srem(DIRTY_KEY, cluster_id)
+            updated += flush_cluster(cluster_id)
+        except Exception as e:
+            logger.error(f"Failed to flush layout for cluster {cluster_id}: {str(e)}")
+    return updated
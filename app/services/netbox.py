@@ -6,25 +6,22 @@ import requests
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 from ..models.settings import AppSettings
-from ..models import db, Cluster, Device, Connection
+from ..models import db, Cluster, Device, Connection, ClusterLink
+from ..log import attach_file_handler
+from .changes import node_change, edge_change, bump_and_record
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-# Add file handler
-import os
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-fh = logging.FileHandler('logs/netbox.log')
-fh.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-fh.setFormatter(formatter)
-logger.addHandler(fh)
+def connection_key(device_a_id, interface_a, device_b_id, interface_b):
+    """Natural key of a connection: its two (device id, interface) ends in sorted order"""
+    return tuple(sorted([(str(device_a_id), interface_a), (str(device_b_id), interface_b)]))
 
 class NetboxService:
     def __init__(self, url=None, token=None, verify_ssl=None, timeout=None):
         """Initialize with optional URL and token, otherwise load from settings"""
-        settings = AppSettings.get_settings()
+        attach_file_handler(logger, 'netbox.log')
+        settings = AppSettings.get_cached()
         self.base_url = url or settings.netbox_url
         # Use the actual token from settings if not provided
         self.token = token or settings.get_token()
@@ -184,8 +181,12 @@ class NetboxService:
             logger.error(f"Failed to fetch connections for device {device_id}: {str(e)}")
             raise
 
-    def sync_cluster(self, cluster_id):
-        """Sync a cluster and all its components"""
+    def sync_cluster(self, cluster_id, progress=None):
+        """Sync a cluster and all its components.
+
+        progress, if given, is called as progress(cluster, stage, done, total)
+        as devices and connections are processed.
+        """
         logger.info(f"Starting sync for cluster {cluster_id}")
         try:
             # Get cluster data
@@ -198,24 +199,72 @@ class NetboxService:
 
             # Get and sync devices
             devices = self.get_cluster_devices(cluster_id)
-            for device_data in devices:
+            changed_devices = {}  # Netbox id -> 'added' | 'modified', journaled with the new version
+            for done, device_data in enumerate(devices, 1):
                 device = Device.query.filter_by(netbox_id=device_data['id']).first()
                 if not device:
                     device = Device(netbox_id=device_data['id'], cluster_id=cluster.id)
+                    before = None
+                else:
+                    before = (device.name, device.device_type, device.meta_data, device.interfaces)
                 device.update_from_netbox(device_data)
                 
                 # Get and update interfaces
                 interfaces = self.get_device_interfaces(device_data['id'])
                 device.update_interfaces(interfaces)
+                if before is None:
+                    changed_devices[device_data['id']] = 'added'
+                elif before != (device.name, device.device_type, device.meta_data, device.interfaces):
+                    changed_devices[device_data['id']] = 'modified'
                 db.session.commit()
+                if progress:
+                    progress(cluster, 'devices', done, len(devices))
 
             # Get and sync connections
-            # Clear existing connections for this cluster
-            Connection.query.filter_by(cluster_id=cluster.id).delete()
+            # Reconcile against existing rows by endpoints so unchanged cables keep their ids
+            existing, duplicates = {}, []
+            for connection in Connection.query.filter_by(cluster_id=cluster.id):
+                key = connection_key(connection.device_a_id, connection.interface_a, connection.device_b_id, connection.interface_b)
+                if key in existing:
+                    duplicates.append(connection)
+                else:
+                    existing[key] = connection
+            added_connections, modified_connections = [], []
+            def reconcile_connection(device_a, interface_a, device_b, interface_b, meta_data):
+                connection = existing.pop(connection_key(device_a.id, interface_a, device_b.id, interface_b), None)
+                if connection is None:
+                    connection = Connection(
+                        cluster_id=cluster.id,
+                        device_a_id=device_a.id,
+                        interface_a=interface_a,
+                        device_b_id=device_b.id,
+                        interface_b=interface_b,
+                        meta_data=meta_data
+                    )
+                    db.session.add(connection)
+                    added_connections.append(connection)
+                elif connection.meta_data != meta_data:
+                    connection.meta_data = meta_data
+                    connection.updated_at = db.func.current_timestamp()
+                    modified_connections.append(connection)
+            
+            synced_at = db.session.execute(db.select(db.func.now())).scalar()
+            
+            # Cables with an end outside this cluster (or not synced yet), keyed by ClusterLink.endpoints
+            cluster_links = {}
+            def is_local(device):
+                return device is not None and str(device.cluster_id) == str(cluster.id)
             
             # Track processed connections to avoid duplicates
             processed_connections = set()  # Format: (device_a_name, interface_a, device_b_name, interface_b)
             
+            # Resolve each device name once per sync instead of once per cable end
+            devices_by_name = {}
+            def resolve_device(name):
+                if name not in devices_by_name:
+                    devices_by_name[name] = Device.query.filter_by(name=name).first()
+                return devices_by_name[name]
+            
             # First try cable-based connections
             for device in cluster.devices:
                 try:
@@ -235,16 +284,15 @@ class NetboxService:
                             if conn_id in processed_connections:
                                 continue
                             
-                            # Create connection
-                            connection = Connection(
-                                cluster_id=cluster.id,
-                                device_a_id=Device.query.filter_by(name=a_term['device']['name']).first().id,
-                                interface_a=a_term['name'],
-                                device_b_id=Device.query.filter_by(name=b_term['device']['name']).first().id,
-                                interface_b=b_term['name']
-                            )
-                            connection.update_from_netbox(cable_data)
-                            db.session.add(connection)
+                            device_a = resolve_device(a_term['device']['name'])
+                            device_b = resolve_device(b_term['device']['name'])
+                            if not (is_local(device_a) and is_local(device_b)):
+                                cluster_links[conn_id] = {'status': cable_data.get('status', {}).get('value'), 'cable': cable_data.get('id')}
+                                processed_connections.add(conn_id)
+                                continue
+                            
+                            reconcile_connection(device_a, a_term['name'], device_b, b_term['name'],
+                                                 Connection.netbox_meta_data(cable_data))
                             processed_connections.add(conn_id)
                         except (KeyError, IndexError) as e:
                             logger.warning(f"Skipping malformed cable data: {str(e)}")
@@ -253,6 +301,9 @@ class NetboxService:
                     logger.warning(f"Failed to get cable connections for device {device.name}: {str(e)}")
                     # Continue to interface-based connections
             
+            if progress:
+                progress(cluster, 'connections', 0, len(devices))
+            
             # Then process interface-based connections
             for device in cluster.devices:
                 try:
@@ -293,36 +344,68 @@ class NetboxService:
                             continue
                         
                         # Find device records
-                        device_a = Device.query.filter_by(name=device_a_name).first()
-                        device_b = Device.query.filter_by(name=device_b_name).first()
+                        device_a = resolve_device(device_a_name)
+                        device_b = resolve_device(device_b_name)
                         
-                        if not device_a or not device_b:
+                        if not device_a:
                             continue
                         
-                        # Create connection
-                        connection = Connection(
-                            cluster_id=cluster.id,
-                            device_a_id=device_a.id,
-                            interface_a=interface_a,
-                            device_b_id=device_b.id,
-                            interface_b=interface_b,
-                            meta_data={
-                                'status': 'connected',
-                                'created': interface.get('created'),
-                                'last_updated': interface.get('last_updated')
-                            }
-                        )
-                        db.session.add(connection)
+                        if not is_local(device_b):
+                            cluster_links[conn_id] = {'status': 'connected'}
+                            processed_connections.add(conn_id)
+                            continue
+                        
+                        reconcile_connection(device_a, interface_a, device_b, interface_b, {
+                            'status': 'connected',
+                            'created': interface.get('created'),
+                            'last_updated': interface.get('last_updated')
+                        })
                         processed_connections.add(conn_id)
                 except Exception as e:
                     logger.warning(f"Failed to process interfaces for device {device.name}: {str(e)}")
                     continue
             
+            # Cables no longer seen
+            removed_connections = list(existing.values()) + duplicates
+            for connection in removed_connections:
+                db.session.delete(connection)
+            
+            ClusterLink.replace_for(cluster, cluster_links, synced_at)
+            db.session.flush()
+            
+            changes = [node_change(changed_devices[device.netbox_id], device)
+                       for device in Device.query.filter(Device.netbox_id.in_(list(changed_devices)))] if changed_devices else []
+            changes += [edge_change('added', connection) for connection in added_connections]
+            changes += [edge_change('modified', connection) for connection in modified_connections]
+            changes += [edge_change('removed', connection) for connection in removed_connections]
+            bump_and_record(cluster, changes)
+            if changes:
+                # The graph index is rebuilt after sync; until then it is keyed by version
+                cluster.graph_digest = None
             db.session.commit()
-            logger.info(f"Successfully synced cluster {cluster_id}")
+            logger.info(f"Successfully synced cluster {cluster_id}: {len(changes)} topology changes")
             return True
             
         except Exception as e:
             logger.error(f"Failed to sync cluster {cluster_id}: {str(e)}")
             db.session.rollback()
+            self._invalidate_changes(cluster_id)
             raise
+
+    @staticmethod
+    def _invalidate_changes(cluster_id):
+        """Start a new topology version that the change journal cannot be replayed into.
+
+        Devices are committed one by one, so a sync that fails part way may
+        have changed some without journaling them; clients must refetch.
+        """
+        try:
+            Cluster.query.filter_by(netbox_id=cluster_id).update({
+                Cluster.topology_version: Cluster.topology_version + 1,
+                Cluster.changes_since: Cluster.topology_version + 1,
+                Cluster.graph_digest: None
+            }, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Failed to invalidate change journal of cluster {cluster_id}: {str(e)}")
+            db.session.rollback()
@@ -0,0 +1,133 @@
+import logging
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from .. import db
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE undefined_table
+UNDEFINED_TABLE = '42P01'
+
+class ReportsUnavailable(RuntimeError):
+    """Raised when the materialized report views have not been created"""
+
+# Aggregate reports computed in PostgreSQL. Each query is also the definition of
+# a materialized view (see migration 20261019_170000 and init.sql) refreshed after
+# sync; key orders rows within a cluster.
+REPORTS = {
+    'devices_by_role': {
+        'description': 'Device counts per cluster by role and status',
+        'view': 'workboard.report_devices_by_role',
+        'key': ('role', 'status'),
+        'sql': """
+            SELECT d.cluster_id,
+                   coalesce(d.meta_data->>'role', '') AS role,
+                   coalesce(d.meta_data->>'status', '') AS status,
+                   count(*) AS devices
+            FROM workboard.devices d
+            WHERE d.cluster_id IS NOT NULL
+            GROUP BY 1, 2, 3
+        """
+    },
+    'unconnected_interfaces': {
+        'description': 'Enabled interfaces with neither a Netbox connection nor a synced cable, per device',
+        'view': 'workboard.report_unconnected_interfaces',
+        'key': ('device', 'device_id'),
+        'sql': """
+            SELECT d.cluster_id, d.id AS device_id, d.name AS device,
+                   count(*) AS interfaces,
+                   array_agg(i.value->>'name' ORDER BY i.value->>'name') AS names
+            FROM workboard.devices d
+            CROSS JOIN LATERAL jsonb_array_elements(coalesce(d.interfaces, '[]'::jsonb)) AS i(value)
+            WHERE d.cluster_id IS NOT NULL
+              AND coalesce((i.value->>'enabled')::boolean, true)
+              AND jsonb_typeof(i.value->'connected_to') IS DISTINCT FROM 'object'
+              AND NOT EXISTS (
+                  SELECT 1 FROM workboard.connections c
+                  WHERE (c.device_a_id = d.id AND c.interface_a = i.value->>'name')
+                     OR (c.device_b_id = d.id AND c.interface_b = i.value->>'name')
+              )
+            GROUP BY 1, 2, 3
+        """
+    },
+    'interfaces_by_device_type': {
+        'description': 'Interface counts per cluster by device type and interface type',
+        'view': 'workboard.report_interfaces_by_device_type',
+        'key': ('device_type', 'interface_type'),
+        'sql': """
+            SELECT d.cluster_id,
+                   coalesce(d.device_type, '') AS device_type,
+                   coalesce(i.value->>'type', '') AS interface_type,
+                   count(DISTINCT d.id) AS devices,
+                   count(*) AS interfaces,
+                   count(*) FILTER (WHERE coalesce((i.value->>'enabled')::boolean, true)) AS enabled,
+                   count(*) FILTER (WHERE jsonb_typeof(i.value->'connected_to') = 'object') AS connected
+            FROM workboard.devices d
+            CROSS JOIN LATERAL jsonb_array_elements(coalesce(d.interfaces, '[]'::jsonb)) AS i(value)
+            WHERE d.cluster_id IS NOT NULL
+            GROUP BY 1, 2, 3
+        """
+    }
+}
+
+def list_reports():
+    return [{'name': name, 'description': report['description']} for name, report in REPORTS.items()]
+
+def run_report(name, cluster=None):
+    """Rows of a report, optionally for one cluster (Netbox id).
+
+    Raises KeyError for unknown reports and ReportsUnavailable when the views are missing.
+
+    Reads the materialized view when REPORTS_MATERIALIZED is set, otherwise
+    runs the aggregate directly. Either way it is a single query.
+    """
+    report = REPORTS[name]
+    materialized = current_app.config.get('REPORTS_MATERIALIZED', True)
+    source = report['view'] if materialized else f"({report['sql']})"
+    where = 'WHERE c.netbox_id = :cluster' if cluster is not None else ''
+    order = ', '.join(f'r.{column}' for column in report['key'])
+    try:
+        rows = db.session.execute(text(
+            f"SELECT c.netbox_id AS cluster, c.name AS cluster_name, r.* "
+            f"FROM {source} AS r JOIN workboard.clusters c ON c.id = r.cluster_id "
+            f"{where} ORDER BY c.name, {order}"
+        ), {'cluster': cluster}).mappings().all()
+    except ProgrammingError as e:
+        if not materialized or getattr(e.orig, 'pgcode', None) != UNDEFINED_TABLE:
+            raise
+        db.session.rollback()
+        raise ReportsUnavailable(
+            f"Report view {report['view']} does not exist; run 'flask init-db' to apply migrations, "
+            f"or set REPORTS_MATERIALIZED=false"
+        ) from e
+    return {
+        'report': name,
+        'source': 'materialized' if materialized else 'live',
+        'rows': [row_to_dict(row, report) for row in rows]
+    }
+
+def row_to_dict(row, report):
+    """Report row with ids as strings and the '' placeholders of key columns as None"""
+    data = {}
+    for key, value in row.items():
+        if key.endswith('_id') and value is not None:
+            value = str(value)
+        elif key in report['key'] and value == '':
+            value = None
+        data[key] = value
+    return data
+
+def refresh_reports():
+    """Refresh every report view after a sync; concurrently, so readers are never blocked. The caller commits."""
+    if not current_app.config.get('REPORTS_MATERIALIZED', True):
+        return 0
+    refreshed = 0
+    for report in REPORTS.values():
+        # A missing view is reported instead of failing every sync
+        if db.session.execute(text('SELECT to_regclass(:view)'), {'view': report['view']}).scalar() is None:
+            logger.warning(f"Report view {report['view']} does not exist; run 'flask init-db' to apply migrations")
+            continue
+        db.session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {report['view']}"))
+        refreshed += 1
+    return refreshed
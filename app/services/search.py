@@ -0,0 +1,139 @@
+import math
+import uuid
+from flask import request
+from sqlalchemy import select, func, literal, case, cast, or_, and_, true, tuple_, column, union_all, Float, String
+from sqlalchemy.dialects.postgresql import JSONB
+from .. import db
+from ..models import Cluster, Device
+from ..pagination import encode_cursor, decode_cursor, page_limit, InvalidCursor
+
+# Shorter terms have no trigrams, so the GIN indexes could not narrow the scan
+SEARCH_MIN_LENGTH = 3
+
+SEARCH_KINDS = ('device', 'interface')
+
+def like_pattern(term):
+    """Substring ILIKE pattern with LIKE wildcards in term escaped"""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+def device_matches(term, pattern):
+    """Devices whose name, type or role contain term, scored by trigram similarity"""
+    score = func.greatest(func.similarity(Device.name, term), func.word_similarity(term, Device.search_text)) \
+        + case((func.lower(Device.name) == term.lower(), 1.0), else_=0.0)
+    return select(
+        literal('device').label('kind'),
+        cast(score, Float).label('score'),
+        Device.id.label('device_id'),
+        Device.name.label('device'),
+        Device.cluster_id.label('cluster_id'),
+        literal('', String).label('interface'),
+        literal(None, String).label('description')
+    ).where(Device.search_text.ilike(pattern))
+
+def interface_matches(term, pattern):
+    """Interfaces whose name or description contain term.
+
+    The trigram index on interface_text finds candidate devices first; only
+    their interface arrays are expanded.
+    """
+    interface = func.jsonb_array_elements(Device.interfaces).table_valued(column('value', JSONB)).lateral('interface')
+    name = func.coalesce(interface.c.value['name'].astext, '')
+    description = func.coalesce(interface.c.value['description'].astext, '')
+    score = func.greatest(func.similarity(name, term), func.word_similarity(term, description) * 0.9) \
+        + case((func.lower(name) == term.lower(), 1.0), else_=0.0)
+    return select(
+        literal('interface').label('kind'),
+        cast(score, Float).label('score'),
+        Device.id.label('device_id'),
+        Device.name.label('device'),
+        Device.cluster_id.label('cluster_id'),
+        name.label('interface'),
+        description.label('description')
+    ).select_from(Device).join(interface, true()) \
+        .where(Device.interface_text.ilike(pattern), or_(name.ilike(pattern), description.ilike(pattern)))
+
+def search(term, kinds=SEARCH_KINDS, cluster=None):
+    """One page of ranked device and interface matches for term, continuing after ?cursor=.
+
+    Results are ordered by score (best first) then kind, device id and
+    interface name, which together form the keyset cursor.
+    """
+    pattern = like_pattern(term)
+    branches = []
+    for kind, matches in (('device', device_matches), ('interface', interface_matches)):
+        if kind in kinds:
+            query = matches(term, pattern)
+            if cluster is not None:
+                query = query.where(Device.cluster_id == cluster)
+            branches.append(query)
+    results = (union_all(*branches) if len(branches) > 1 else branches[0]).subquery('results')
+
+    query = select(results)
+    cursor = request.args.get('cursor')
+    if cursor:
+        score, kind, device_id, interface = search_cursor(cursor)
+        query = query.where(or_(
+            results.c.score < score,
+            and_(results.c.score == score,
+                 tuple_(results.c.kind, results.c.device_id, results.c.interface) > tuple_(kind, device_id, interface))
+        ))
+
+    limit = page_limit()
+    rows = db.session.execute(
+        query.order_by(results.c.score.desc(), results.c.kind, results.c.device_id, results.c.interface).limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        'status': 'success',
+        'data': [result_to_dict(row) for row in rows],
+        'pagination': {
+            'limit': limit,
+            'next_cursor': encode_cursor([rows[-1].score, rows[-1].kind, str(rows[-1].device_id), rows[-1].interface]) if has_more else None
+        }
+    }
+
+def search_cursor(cursor):
+    """Decode a search cursor into (score, kind, device id, interface); raises InvalidCursor"""
+    score, kind, device_id, interface = decode_cursor(cursor, 4)
+    if (not isinstance(score, (int, float)) or isinstance(score, bool) or not math.isfinite(score)
+            or kind not in SEARCH_KINDS or not isinstance(interface, str) or not isinstance(device_id, str)):
+        raise InvalidCursor('Invalid cursor')
+    try:
+        return score, kind, str(uuid.UUID(device_id)), interface
+    except ValueError as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+def result_to_dict(row):
+    result = {
+        'kind': row.kind,
+        'score': round(row.score, 4),
+        'device': {
+            'id': str(row.device_id),
+            'name': row.device,
+            'cluster_id': str(row.cluster_id) if row.cluster_id else None
+        }
+    }
+    if row.kind == 'interface':
+        result['interface'] = {'name': row.interface, 'description': row.description}
+    return result
+
+def requested_search():
+    """Parse ?q=, ?kind= and ?cluster=<netbox_id>; raises ValueError on bad input"""
+    term = request.args.get('q', '').strip()
+    if len(term) < SEARCH_MIN_LENGTH:
+        raise ValueError(f'q must be at least {SEARCH_MIN_LENGTH} characters')
+    kinds = SEARCH_KINDS
+    if request.args.get('kind'):
+        if request.args['kind'] not in SEARCH_KINDS:
+            raise ValueError(f"Unknown kind '{request.args['kind']}' (expected {', '.join(SEARCH_KINDS)})")
+        kinds = (request.args['kind'],)
+    cluster = None
+    if request.args.get('cluster'):
+        netbox_id = request.args.get('cluster', type=int)
+        if netbox_id is None:
+            raise ValueError('cluster must be a Netbox cluster id')
+        cluster = Cluster.query.with_entities(Cluster.id).filter_by(netbox_id=netbox_id).scalar_subquery()
+    return term, kinds, cluster
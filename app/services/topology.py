@@ -0,0 +1,364 @@
+import gzip
+import logging
+import threading
+from collections import OrderedDict
+import redis
+from flask import request, Response, current_app
+from sqlalchemy.orm import defer
+from ..cache import cache
+from ..compression import encoded_etag, etag_variants
+from .aggregation import GROUP_BY_FIELDS, aggregate_elements
+from .columnar import COLUMNAR_MIMETYPE, requested_encoding, representation_etag, columnar_payload
+from ..models import Device, Connection, LayoutSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Redis key prefix for rendered topology payloads
+TOPOLOGY_CACHE_PREFIX = 'crumple:topology'
+
+# Payload shapes: 'ui' for /api/clusters/<id>, 'v1' for /api/v1/clusters/<id>
+FLAVORS = ('ui', 'v1')
+
+# Named field selections for ?profile=, mapping a section to the element data
+# keys it keeps. A section that is not listed keeps every field.
+PROFILES = {
+    'overview': {
+        'nodes': frozenset(('label', 'type', 'role', 'role_color')),
+        'edges': frozenset(('sourceInterface', 'targetInterface', 'status'))
+    },
+    'full': {}
+}
+DEFAULT_PROFILE = 'full'
+
+# Element data keys that are always sent, whatever the selection
+REQUIRED_FIELDS = frozenset(('id', 'source', 'target'))
+
+def requested_fields():
+    """Field selection from ?fields=nodes.label,edges.status,... or ?profile=
+
+    Raises ValueError for unknown profiles or malformed field names.
+    """
+    fields = request.args.get('fields')
+    if fields:
+        selection = {}
+        for item in fields.split(','):
+            section, _, name = item.strip().partition('.')
+            if section not in ('nodes', 'edges') or not name:
+                raise ValueError(f"Invalid field '{item}', expected nodes.<field> or edges.<field>")
+            selection.setdefault(section, set()).add(name)
+        return {section: frozenset(names) for section, names in selection.items()}
+
+    profile = request.args.get('profile', DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}', expected one of: {', '.join(PROFILES)}")
+    return PROFILES[profile]
+
+def requested_view():
+    """Aggregated view from ?group_by=role|rack|site and ?group= (the group to expand), or None
+
+    Raises ValueError for unknown grouping attributes.
+    """
+    group_by = request.args.get('group_by')
+    group = request.args.get('group')
+    if not group_by:
+        if group:
+            raise ValueError('group requires group_by')
+        return None
+    if group_by not in GROUP_BY_FIELDS:
+        raise ValueError(f"Unknown group_by '{group_by}', expected one of: {', '.join(GROUP_BY_FIELDS)}")
+    return {'group_by': group_by, 'group': group}
+
+def requested_snapshot(cluster):
+    """Layout snapshot named by ?layout=, or None for the devices' own positions
+
+    Raises LookupError if the cluster has no snapshot with that name.
+    """
+    name = request.args.get('layout')
+    if not name:
+        return None
+    snapshot = LayoutSnapshot.lookup(cluster.id, name)
+    if snapshot is None:
+        raise LookupError(f"Layout '{name}' not found")
+    return snapshot
+
+def selection_key(selection):
+    """Stable cache key component for a field selection"""
+    if not selection:
+        return 'full'
+    return ';'.join(f"{section}={'+'.join(sorted(selection[section]))}" for section in sorted(selection))
+
+def view_key(view):
+    """Stable cache key component for an aggregated view ('' for the flat topology)"""
+    if not view:
+        return ''
+    return f";group_by={view['group_by']};group={view['group'] or ''}"
+
+def wants(fields, name):
+    return fields is None or name in fields
+
+def pick(data, fields):
+    """Keep only the selected (and required) keys of an element's data"""
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields or key in REQUIRED_FIELDS}
+
+def topology_etag(cluster, snapshot=None):
+    """Strong ETag for a cluster's topology payload.
+
+    The topology version covers devices, connections and positions; last_sync
+    and sync_in_progress cover the cluster fields embedded in the payload, and
+    the snapshot revision covers positions merged from a layout snapshot.
+    """
+    last_sync = int(cluster.last_sync.timestamp()) if cluster.last_sync else 0
+    etag = f'{cluster.id}-{cluster.topology_version}-{last_sync}-{int(bool(cluster.sync_in_progress))}'
+    if snapshot is not None:
+        etag = f'{etag}-{snapshot.etag_suffix()}'
+    return etag
+
+def not_modified(etag):
+    """Return a 304 response if the request's If-None-Match matches etag (in the requested encoding), else None"""
+    etag = representation_etag(etag, requested_encoding())
+    matched = next((tag for tag in etag_variants(etag) if tag in request.if_none_match), None)
+    if matched:
+        response = Response(status=304)
+        response.set_etag(matched)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+def with_etag(response, etag):
+    """Attach the topology ETag and require revalidation on every use"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def ui_node(device, fields=None):
+    """Cytoscape node in the shape the workboard UI expects"""
+    meta_data = device.meta_data or {}
+    data = {
+        'id': str(device.id),
+        'label': device.name,
+        'type': device.device_type,
+        'role': meta_data.get('role'),
+        'role_color': meta_data.get('role_color'),
+        'metadata': dict(meta_data)
+    }
+    # Interfaces are the bulk of the payload and are deferred when not selected
+    if wants(fields, 'interfaces'):
+        data['interfaces'] = list(device.interfaces) if device.interfaces else []
+    return {
+        'data': pick(data, fields),
+        'position': device.position or {'x': 0, 'y': 0}
+    }
+
+def v1_node(device, fields=None):
+    """Cytoscape node in the v1 API shape"""
+    meta_data = device.meta_data or {}
+    data = {
+        'id': str(device.id),
+        'label': device.name,
+        'type': device.device_type,
+        'meta_data': dict(meta_data),
+        'role': meta_data.get('role'),
+        'role_color': meta_data.get('role_color')
+    }
+    if wants(fields, 'interfaces'):
+        data['interfaces'] = device.interfaces or []
+    return {
+        'data': pick(data, fields),
+        'position': device.position or {'x': 0, 'y': 0}
+    }
+
+def ui_edge(conn, fields=None):
+    """Cytoscape edge in the shape the workboard UI expects"""
+    edge = conn.to_cytoscape_edge()
+    edge['data'] = pick(edge['data'], fields)
+    return edge
+
+def v1_edge(conn, fields=None):
+    """Cytoscape edge in the v1 API shape"""
+    return {
+        'data': pick({
+            'id': f'e{conn.id}',
+            'source': str(conn.device_a_id),
+            'target': str(conn.device_b_id),
+            'sourceInterface': conn.interface_a,
+            'targetInterface': conn.interface_b,
+            'status': conn.meta_data.get('status') if isinstance(conn.meta_data, dict) else None,
+            'meta_data': dict(conn.meta_data) if conn.meta_data else {}
+        }, fields)
+    }
+
+def build_payload(cluster, flavor, elements, view=None):
+    """Wrap Cytoscape elements in the topology response body for a flavor"""
+    if flavor == 'ui':
+        payload = {'cluster': cluster.to_dict(), 'elements': elements}
+        if view:
+            payload['view'] = view
+        return payload
+
+    cluster_data = cluster.to_dict()
+    cluster_data['meta_data'] = dict(cluster.meta_data) if cluster.meta_data else {}
+    cluster_data['layout_data'] = dict(cluster.layout_data) if cluster.layout_data else {}
+    data = {'cluster': cluster_data, 'elements': elements}
+    if view:
+        data['view'] = view
+    return {
+        'status': 'success',
+        'data': data
+    }
+
+def merge_positions(nodes, positions):
+    """Overlay compact snapshot positions ({device_id: [x, y]}) on nodes"""
+    for node in nodes:
+        position = positions.get(node['data']['id'])
+        if position and 'position' in node:
+            node['position'] = {'x': position[0], 'y': position[1]}
+
+def render_topology(cluster, flavor, selection=None, view=None, snapshot=None, encoding='json'):
+    """Load a cluster's devices and connections and serialize the payload to JSON or columnar bytes"""
+    selection = selection or {}
+    node = ui_node if flavor == 'ui' else v1_node
+    edge = ui_edge if flavor == 'ui' else v1_edge
+
+    if view:
+        elements = aggregate_elements(cluster, view['group_by'], view['group'], node, edge, selection)
+    else:
+        node_fields, edge_fields = selection.get('nodes'), selection.get('edges')
+        query = Device.query.filter_by(cluster_id=cluster.id)
+        if not wants(node_fields, 'interfaces'):
+            query = query.options(defer(Device.interfaces))
+        elements = {
+            'nodes': [node(device, node_fields) for device in query.all()],
+            'edges': [edge(conn, edge_fields) for conn in Connection.query.filter_by(cluster_id=cluster.id).all()]
+        }
+    if snapshot is not None:
+        merge_positions(elements['nodes'], snapshot.positions or {})
+    payload = build_payload(cluster, flavor, elements, view)
+    if encoding == 'columnar':
+        return columnar_payload(payload)
+    return current_app.json.dump_bytes(payload)
+
+class RenderedTopologyCache:
+    """Two-level cache of rendered topology payloads keyed by flavor, field selection and ETag.
+
+    Keys embed the topology version, so entries never go stale; a version bump
+    simply makes the old key unreachable. Each encoding has its own ETag and
+    therefore its own entries. Level one is a small in-process LRU,
+    level two is Redis shared by all web and worker processes.
+    """
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(flavor, selection, etag, view=None):
+        return f'{TOPOLOGY_CACHE_PREFIX}:{flavor}:{selection_key(selection)}{view_key(view)}:{etag}'
+
+    def get(self, cluster, flavor, etag, selection=None, view=None, snapshot=None, encoding='json'):
+        """Return (body_bytes, gzip_bytes_or_None), rendering and storing on a miss"""
+        key = self._key(flavor, selection, etag, view)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                self._local.move_to_end(key)
+                return entry
+
+        entry = self._redis_get(key)
+        if entry is None:
+            entry = self.store(cluster, flavor, etag, selection, view, snapshot, encoding)
+        else:
+            self._remember(key, entry)
+        return entry
+
+    def store(self, cluster, flavor, etag, selection=None, view=None, snapshot=None, encoding='json'):
+        """Render a payload and put it in both cache levels (etag must identify the snapshot and encoding)"""
+        key = self._key(flavor, selection, etag, view)
+        body = render_topology(cluster, flavor, selection, view, snapshot, encoding)
+        compressed = gzip.compress(body, compresslevel=current_app.config.get('COMPRESSION_GZIP_LEVEL', 6)) if current_app.config.get('TOPOLOGY_CACHE_GZIP') else None
+        entry = (body, compressed)
+
+        if cache.redis is not None:
+            try:
+                ttl = current_app.config.get('TOPOLOGY_CACHE_TTL', 86400)
+                pipe = cache.redis.pipeline()
+                pipe.set(f'{key}:json', body, ex=ttl)
+                if compressed is not None:
+                    pipe.set(f'{key}:gz', compressed, ex=ttl)
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.warning(f"Failed to store rendered topology {key}: {str(e)}")
+
+        self._remember(key, entry)
+        return entry
+
+    def invalidate(self, etag):
+        """Drop every flavor and profile rendered for etag (e.g. after a layout save).
+
+        Ad-hoc ?fields= selections and aggregated views are left to expire
+        with TOPOLOGY_CACHE_TTL.
+        """
+        keys = [
+            self._key(flavor, selection, representation_etag(etag, encoding))
+            for flavor in FLAVORS for selection in PROFILES.values() for encoding in ('json', 'columnar')
+        ]
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        if cache.redis is not None:
+            try:
+                cache.redis.delete(*[f'{key}:{suffix}' for key in keys for suffix in ('json', 'gz')])
+            except redis.RedisError as e:
+                logger.warning(f"Failed to invalidate rendered topology {etag}: {str(e)}")
+
+    def _redis_get(self, key):
+        if cache.redis is None:
+            return None
+        try:
+            body, compressed = cache.redis.mget(f'{key}:json', f'{key}:gz')
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read rendered topology {key}: {str(e)}")
+            return None
+        return (body, compressed) if body is not None else None
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > current_app.config.get('TOPOLOGY_CACHE_LOCAL_ENTRIES', 8):
+                self._local.popitem(last=False)
+
+rendered_topologies = RenderedTopologyCache()
+
+def topology_response(cluster, flavor, etag, selection=None, view=None, snapshot=None):
+    """Serve a topology payload from pre-serialized (and pre-compressed) bytes.
+
+    Clients that prefer COLUMNAR_MIMETYPE in Accept get the columnar MessagePack encoding.
+    """
+    encoding = requested_encoding()
+    etag = representation_etag(etag, encoding)
+    mimetype = COLUMNAR_MIMETYPE if encoding == 'columnar' else 'application/json'
+    body, compressed = rendered_topologies.get(cluster, flavor, etag, selection, view, snapshot, encoding)
+    if compressed is not None and request.accept_encodings['gzip'] > 0:
+        response = Response(compressed, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+        etag = encoded_etag(etag, 'gzip')
+    else:
+        # Left for the compression hook, which picks br/gzip and suffixes the ETag
+        response = Response(body, mimetype=mimetype)
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+    return with_etag(response, etag)
+
+def warm_topology_cache(cluster):
+    """Render every flavor and profile for a cluster's current version; called by the worker after sync"""
+    if cluster is None:
+        return
+    etag = topology_etag(cluster)
+    for flavor in FLAVORS:
+        for selection in PROFILES.values():
+            try:
+                rendered_topologies.store(cluster, flavor, etag, selection)
+            except Exception as e:
+                logger.warning(f"Failed to pre-render {flavor} topology for cluster {cluster.id}: {str(e)}")
@@ -0,0 +1,175 @@
+// Decoder for the columnar MessagePack topology encoding (app/services/columnar.py).
+// fetchTopology() asks for it and returns the same object as the JSON endpoints,
+// with elements already expanded into Cytoscape nodes and edges.
+(function (global) {
+    'use strict';
+
+    const COLUMNAR_MIMETYPE = 'application/vnd.crumple.columnar+msgpack';
+    const NULL_STRING = 0xFFFFFFFF;
+
+    // Minimal MessagePack reader: nil, bool, int, float, str, bin, array, map
+    function unpack(buffer) {
+        const bytes = new Uint8Array(buffer);
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        const text = new TextDecoder();
+        let offset = 0;
+
+        function str(length) {
+            const value = text.decode(bytes.subarray(offset, offset + length));
+            offset += length;
+            return value;
+        }
+        function bin(length) {
+            // Copied so typed array views over it are aligned
+            const value = bytes.slice(offset, offset + length);
+            offset += length;
+            return value;
+        }
+        function array(length) {
+            const value = new Array(length);
+            for (let i = 0; i < length; i++) value[i] = read();
+            return value;
+        }
+        function map(length) {
+            const value = {};
+            for (let i = 0; i < length; i++) {
+                const key = read();
+                value[key] = read();
+            }
+            return value;
+        }
+        function read() {
+            const type = bytes[offset++];
+            if (type <= 0x7f) return type;
+            if (type <= 0x8f) return map(type & 0x0f);
+            if (type <= 0x9f) return array(type & 0x0f);
+            if (type <= 0xbf) return str(type & 0x1f);
+            if (type >= 0xe0) return type - 0x100;
+            let value;
+            switch (type) {
+                case 0xc0: return null;
+                case 0xc2: return false;
+                case 0xc3: return true;
+                case 0xc4: value = view.getUint8(offset); offset += 1; return bin(value);
+                case 0xc5: value = view.getUint16(offset); offset += 2; return bin(value);
+                case 0xc6: value = view.getUint32(offset); offset += 4; return bin(value);
+                case 0xca: value = view.getFloat32(offset); offset += 4; return value;
+                case 0xcb: value = view.getFloat64(offset); offset += 8; return value;
+                case 0xcc: value = view.getUint8(offset); offset += 1; return value;
+                case 0xcd: value = view.getUint16(offset); offset += 2; return value;
+                case 0xce: value = view.getUint32(offset); offset += 4; return value;
+                case 0xcf: value = Number(view.getBigUint64(offset)); offset += 8; return value;
+                case 0xd0: value = view.getInt8(offset); offset += 1; return value;
+                case 0xd1: value = view.getInt16(offset); offset += 2; return value;
+                case 0xd2: value = view.getInt32(offset); offset += 4; return value;
+                case 0xd3: value = Number(view.getBigInt64(offset)); offset += 8; return value;
+                case 0xd9: value = view.getUint8(offset); offset += 1; return str(value);
+                case 0xda: value = view.getUint16(offset); offset += 2; return str(value);
+                case 0xdb: value = view.getUint32(offset); offset += 4; return str(value);
+                case 0xdc: value = view.getUint16(offset); offset += 2; return array(value);
+                case 0xdd: value = view.getUint32(offset); offset += 4; return array(value);
+                case 0xde: value = view.getUint16(offset); offset += 2; return map(value);
+                case 0xdf: value = view.getUint32(offset); offset += 4; return map(value);
+            }
+            throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+        }
+
+        return read();
+    }
+
+    // Typed arrays are sent little-endian; every browser Cytoscape supports is little-endian
+    function typed(Type, bytes) {
+        return new Type(bytes.buffer, bytes.byteOffset, bytes.byteLength / Type.BYTES_PER_ELEMENT);
+    }
+
+    // Copy each column into the rows' data objects, leaving out nulls
+    function fillColumns(rows, columns, strings) {
+        Object.keys(columns).forEach(function (key) {
+            const column = columns[key];
+            if (column.type === 'string') {
+                const values = typed(Uint32Array, column.values);
+                for (let i = 0; i < rows.length; i++) {
+                    if (values[i] !== NULL_STRING) rows[i].data[key] = strings[values[i]];
+                }
+            } else if (column.type === 'number') {
+                const values = typed(Float64Array, column.values);
+                for (let i = 0; i < rows.length; i++) {
+                    if (!Number.isNaN(values[i])) rows[i].data[key] = values[i];
+                }
+            } else {
+                for (let i = 0; i < rows.length; i++) {
+                    if (column.values[i] !== null) rows[i].data[key] = column.values[i];
+                }
+            }
+        });
+    }
+
+    // Columnar elements -> { nodes: [...], edges: [...] } in Cytoscape's shape
+    function decodeElements(encoded) {
+        const strings = encoded.strings;
+        const nodeIds = typed(Uint32Array, encoded.nodes.id);
+        const positions = typed(Float64Array, encoded.nodes.position);
+        const nodes = new Array(encoded.nodes.count);
+        for (let i = 0; i < nodes.length; i++) {
+            nodes[i] = { data: { id: strings[nodeIds[i]] } };
+            if (!Number.isNaN(positions[2 * i])) {
+                nodes[i].position = { x: positions[2 * i], y: positions[2 * i + 1] };
+            }
+        }
+        fillColumns(nodes, encoded.nodes.data, strings);
+
+        const edgeIds = typed(Uint32Array, encoded.edges.id);
+        const sources = typed(Int32Array, encoded.edges.source);
+        const targets = typed(Int32Array, encoded.edges.target);
+        const edges = new Array(encoded.edges.count);
+        for (let i = 0; i < edges.length; i++) {
+            edges[i] = {
+                data: {
+                    id: strings[edgeIds[i]],
+                    source: sources[i] >= 0 ? nodes[sources[i]].data.id : null,
+                    target: targets[i] >= 0 ? nodes[targets[i]].data.id : null
+                }
+            };
+        }
+        fillColumns(edges, encoded.edges.data, strings);
+
+        // Edges to nodes outside the payload cannot be added to Cytoscape
+        return { nodes: nodes, edges: edges.filter(edge => edge.data.source !== null && edge.data.target !== null) };
+    }
+
+    // Decode a columnar response body into the JSON payload shape (ui or v1)
+    function decodeTopology(buffer) {
+        const payload = unpack(buffer);
+        const target = payload.data && payload.data.elements ? payload.data : payload;
+        if (target.elements && target.elements.format === 'columnar') {
+            target.elements = decodeElements(target.elements);
+        }
+        return payload;
+    }
+
+    // GET a topology URL preferring the columnar encoding; falls back to JSON when the server sends it
+    function fetchTopology(url) {
+        return fetch(url, {
+            credentials: 'same-origin',
+            headers: { 'Accept': `${COLUMNAR_MIMETYPE}, application/json;q=0.9` }
+        }).then(function (response) {
+            if (!response.ok) {
+                const error = new Error(`HTTP ${response.status}`);
+                error.status = response.status;
+                throw error;
+            }
+            if ((response.headers.get('Content-Type') || '').startsWith(COLUMNAR_MIMETYPE)) {
+                return response.arrayBuffer().then(decodeTopology);
+            }
+            return response.json();
+        });
+    }
+
+    global.Columnar = {
+        MIMETYPE: COLUMNAR_MIMETYPE,
+        unpack: unpack,
+        decodeElements: decodeElements,
+        decodeTopology: decodeTopology,
+        fetchTopology: fetchTopology
+    };
+})(window);
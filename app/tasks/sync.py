@@ -1,26 +1,116 @@
-import os
 import time
 import logging
+import redis
 from datetime import datetime
+from flask import current_app
 from ..services import NetboxService
+from ..services.topology import warm_topology_cache
+from ..services.layout import layout_cluster
+from ..services.layout_buffer import flush_all
+from ..services.graph import warm_graph_index
+from ..services.analytics import analyze_cluster
+from ..services.reports import refresh_reports
 from ..models.settings import AppSettings
 from ..models import db
+from ..cache import cache
+from ..log import attach_file_handler
+from ..events import events
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-# Add file handler
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-fh = logging.FileHandler('logs/sync.log')
-fh.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-fh.setFormatter(formatter)
-logger.addHandler(fh)
+# Redis set of cluster ids synced by the web app whose derived data the worker still has to compute
+AFTER_SYNC_KEY = 'crumple:sync:after'
+
+def progress_publisher(interval=1.0):
+    """sync_cluster progress callback publishing at most one event per stage per interval"""
+    last = {'stage': None, 'at': 0.0}
+    
+    def report(cluster, stage, done, total):
+        now = time.monotonic()
+        if stage == last['stage'] and done < total and now - last['at'] < interval:
+            return
+        last.update(stage=stage, at=now)
+        events.publish('sync_progress', cluster, stage=stage, done=done, total=total)
+    return report
+
+def after_cluster_sync(cluster):
+    """Derived data of a freshly synced cluster: layout, warm caches and analytics.
+
+    Each step is best effort; a failure is logged and leaves the sync itself intact.
+    """
+    # Position new devices server-side so the UI can open with a preset layout
+    try:
+        if layout_cluster(cluster):
+            db.session.commit()
+    except Exception as e:
+        logger.warning(f"Failed to compute layout for cluster {cluster.netbox_id}: {str(e)}")
+        db.session.rollback()
+    
+    # Pre-render topology payloads so the first view after a sync is a cache hit
+    warm_topology_cache(cluster)
+    index = warm_graph_index(cluster)
+    
+    # Structural risk metrics, stored next to the cluster for dashboards
+    try:
+        if index is not None:
+            analyze_cluster(cluster, index)
+            db.session.commit()
+    except Exception as e:
+        logger.warning(f"Failed to analyze cluster {cluster.netbox_id}: {str(e)}")
+        db.session.rollback()
+
+def after_sync():
+    """Refresh the aggregate report views once the clusters of a sync are done"""
+    try:
+        refresh_reports()
+        db.session.commit()
+    except Exception as e:
+        logger.warning(f"Failed to refresh reports: {str(e)}")
+        db.session.rollback()
+
+def schedule_after_sync(cluster):
+    """Hand after_cluster_sync of a cluster synced outside the worker to the worker.
+
+    Returns False when there is no Redis to queue on; the next full sync
+    then brings the cluster's derived data up to date.
+    """
+    if cache.redis is None:
+        return False
+    try:
+        cache.redis.sadd(AFTER_SYNC_KEY, str(cluster.id))
+        return True
+    except redis.RedisError as e:
+        logger.warning(f"Failed to schedule post-sync work for cluster {cluster.netbox_id}: {str(e)}")
+        return False
+
+def run_scheduled_after_sync():
+    """Run after_cluster_sync for clusters queued by schedule_after_sync, then refresh reports once"""
+    from ..models import Cluster
+    if cache.redis is None:
+        return 0
+
+    done = 0
+    while True:
+        try:
+            cluster_id = cache.redis.spop(AFTER_SYNC_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read scheduled post-sync work: {str(e)}")
+            break
+        if cluster_id is None:
+            break
+        cluster = Cluster.query.get(cluster_id.decode())
+        if cluster:
+            after_cluster_sync(cluster)
+            done += 1
+    if done:
+        after_sync()
+    return done
 
 def perform_sync(settings=None):
     """Perform a single sync operation"""
+    attach_file_handler(logger, 'sync.log')
     sync_id = int(time.time() * 1000)
     logger.info(f"[Sync {sync_id}] Starting sync operation")
     
@@ -49,21 +139,34 @@ def perform_sync(settings=None):
                     if cluster:
                         cluster.sync_in_progress = True
                         db.session.commit()
+                        events.publish('sync_started', cluster)
                     
                     # Perform sync
-                    netbox.sync_cluster(cluster_id)
+                    netbox.sync_cluster(cluster_id, progress=progress_publisher())
                     
                     # Update sync status
                     if cluster:
                         cluster.sync_in_progress = False
                         cluster.last_sync = datetime.utcnow()
                         db.session.commit()
+                    
+                    synced = Cluster.query.filter_by(netbox_id=cluster_id).first()
+                    if synced:
+                        after_cluster_sync(synced)
+                        events.publish('sync_completed', synced, last_sync=synced.last_sync,
+                                       topology_version=synced.topology_version)
                 except Exception as e:
                     logger.error(f"[Sync {sync_id}] Error syncing cluster {cluster_id}: {str(e)}")
                     if cluster:
                         cluster.sync_in_progress = False
                         db.session.commit()
-                    continue
+                        events.publish('sync_failed', cluster, message=str(e))
+                finally:
+                    # Layout saves buffered during a long sync reach the database between clusters
+                    flush_layouts()
+            
+            # Aggregate reports read from materialized views; refreshed once per sync run
+            after_sync()
             
             # Update sync status
             elapsed = time.time() - start_time
@@ -85,9 +188,36 @@ def perform_sync(settings=None):
         from ..models import Cluster
         Cluster.query.update({Cluster.sync_in_progress: False})
         db.session.commit()
+        events.publish('sync_failed', message=str(e))
         
         return False, str(e)
 
+def flush_layouts():
+    """Write buffered layout saves to the database; failures are logged"""
+    try:
+        updated = flush_all()
+        if updated:
+            logger.debug(f"Flushed {updated} buffered device positions")
+    except Exception as e:
+        logger.error(f"Layout flush failed: {str(e)}")
+        db.session.rollback()
+
+def wait_flushing_layouts(seconds):
+    """Sleep until the next sync, flushing buffered layout saves and running scheduled post-sync work every LAYOUT_FLUSH_INTERVAL seconds"""
+    interval = current_app.config.get('LAYOUT_FLUSH_INTERVAL', 5)
+    deadline = time.monotonic() + seconds
+    while True:
+        flush_layouts()
+        try:
+            run_scheduled_after_sync()
+        except Exception as e:
+            logger.error(f"Scheduled post-sync work failed: {str(e)}")
+            db.session.rollback()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(interval, remaining))
+
 def run_sync():
     """Main sync loop"""
     logger.info("Starting sync worker")
@@ -97,10 +227,10 @@ def run_sync():
         success, error = perform_sync(settings)
         if not success:
             logger.error(f"Sync error: {error}")
-            time.sleep(60)  # Wait a minute before retrying
+            wait_flushing_layouts(60)  # Wait a minute before retrying
         else:
             logger.info(f"Waiting {settings.sync_interval}s until next sync")
-            time.sleep(settings.sync_interval)
+            wait_flushing_layouts(settings.sync_interval)
 
 if __name__ == '__main__':
     run_sync()
@@ -1,9 +1,9 @@
 import os
 from app import create_app
-from asgiref.wsgi import WsgiToAsgi
+from app.events import EventStreamApp
 
 # Create Flask application with Docker-aware configuration
 flask_app = create_app(os.getenv('FLASK_CONFIG', 'development'))
 
-# Create WSGI to ASGI wrapper for Uvicorn
-app = WsgiToAsgi(flask_app)
+# Flask runs behind WsgiToAsgi; Server-Sent Event streams are served on the event loop
+app = EventStreamApp(flask_app)
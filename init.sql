@@ -1,9 +1,14 @@
 -- Enable necessary extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 CREATE EXTENSION IF NOT EXISTS "hstore";
+CREATE EXTENSION IF NOT EXISTS "pg_trgm";
 
 -- Enable row-level security
-ALTER DATABASE crumple SET row_security = on;
+DO $$
+BEGIN
+    EXECUTE format('ALTER DATABASE %I SET row_security = on', current_database());
+END
+$$;
 
 -- Create schemas
 CREATE SCHEMA IF NOT EXISTS netbox;
@@ -50,6 +55,10 @@ CREATE TABLE workboard.clusters (
     meta_data JSONB,
     last_sync TIMESTAMP WITH TIME ZONE,
     sync_in_progress BOOLEAN NOT NULL DEFAULT FALSE,
+    topology_version INTEGER NOT NULL DEFAULT 0,
+    changes_since INTEGER NOT NULL DEFAULT 0,
+    graph_digest VARCHAR(64),
+    analytics JSONB,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -63,6 +72,9 @@ CREATE TABLE workboard.devices (
     interfaces JSONB,
     position JSONB,
     meta_data JSONB,
+    -- Searched through trigram indexes by /api/v1/search
+    search_text TEXT GENERATED ALWAYS AS (coalesce(name, '') || ' ' || coalesce(device_type, '') || ' ' || coalesce(meta_data->>'role', '')) STORED,
+    interface_text TEXT GENERATED ALWAYS AS (coalesce(jsonb_path_query_array(interfaces, '$[*].name')::text, '') || ' ' || coalesce(jsonb_path_query_array(interfaces, '$[*].description')::text, '')) STORED,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -79,6 +91,46 @@ CREATE TABLE workboard.connections (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Named layout snapshots: one row per arrangement, positions as {device_id: [x, y]}
+CREATE TABLE workboard.layout_snapshots (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    cluster_id UUID NOT NULL REFERENCES workboard.clusters(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    positions JSONB NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_layout_snapshots_cluster_name UNIQUE (cluster_id, name)
+);
+
+-- Cables between clusters, endpoints in (device name, interface) order; ids resolved once both ends are synced
+CREATE TABLE workboard.cluster_links (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    device_a_name VARCHAR(255) NOT NULL,
+    interface_a VARCHAR(255) NOT NULL,
+    device_b_name VARCHAR(255) NOT NULL,
+    interface_b VARCHAR(255) NOT NULL,
+    device_a_id UUID REFERENCES workboard.devices(id) ON DELETE SET NULL,
+    device_b_id UUID REFERENCES workboard.devices(id) ON DELETE SET NULL,
+    cluster_a_id UUID REFERENCES workboard.clusters(id) ON DELETE SET NULL,
+    cluster_b_id UUID REFERENCES workboard.clusters(id) ON DELETE SET NULL,
+    meta_data JSONB,
+    synced_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_cluster_links_endpoints UNIQUE (device_a_name, interface_a, device_b_name, interface_b)
+);
+
+-- Change journal: nodes and edges added, removed or modified at each topology version
+CREATE TABLE workboard.topology_changes (
+    id BIGSERIAL PRIMARY KEY,
+    cluster_id UUID NOT NULL REFERENCES workboard.clusters(id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    element VARCHAR(8) NOT NULL,
+    op VARCHAR(16) NOT NULL,
+    element_id VARCHAR(64) NOT NULL,
+    data JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create device roles table with predefined roles and colors
 CREATE TABLE workboard.device_roles (
     id SERIAL PRIMARY KEY,
@@ -92,12 +144,72 @@ CREATE TABLE workboard.device_roles (
 CREATE INDEX idx_clusters_netbox_id ON workboard.clusters(netbox_id);
 CREATE INDEX idx_devices_cluster_id ON workboard.devices(cluster_id);
 CREATE INDEX idx_devices_netbox_id ON workboard.devices(netbox_id);
+CREATE INDEX idx_devices_name ON workboard.devices(name);
 CREATE INDEX idx_connections_cluster_id ON workboard.connections(cluster_id);
+CREATE INDEX idx_connections_device_a_id ON workboard.connections(device_a_id);
+CREATE INDEX idx_connections_device_b_id ON workboard.connections(device_b_id);
+CREATE INDEX idx_cluster_links_cluster_a_id ON workboard.cluster_links(cluster_a_id);
+CREATE INDEX idx_cluster_links_cluster_b_id ON workboard.cluster_links(cluster_b_id);
+CREATE INDEX idx_topology_changes_cluster_version ON workboard.topology_changes(cluster_id, version, id);
+
+-- Keyset pagination: each index matches a filter plus the page ordering
+CREATE INDEX idx_devices_name_id ON workboard.devices(name, id);
+CREATE INDEX idx_devices_cluster_name_id ON workboard.devices(cluster_id, name, id);
+CREATE INDEX idx_devices_role_name_id ON workboard.devices((meta_data->>'role'), name, id);
+CREATE INDEX idx_devices_status_name_id ON workboard.devices((meta_data->>'status'), name, id);
+CREATE INDEX idx_connections_cluster_id_id ON workboard.connections(cluster_id, id);
 
 -- Add GiST index for JSONB fields
 CREATE INDEX idx_devices_interfaces_gin ON workboard.devices USING gin (interfaces);
 CREATE INDEX idx_clusters_layout_gin ON workboard.clusters USING gin (layout_data);
 
+-- Trigram indexes for substring and similarity search
+CREATE INDEX idx_devices_search_text_trgm ON workboard.devices USING gin (search_text gin_trgm_ops);
+CREATE INDEX idx_devices_interface_text_trgm ON workboard.devices USING gin (interface_text gin_trgm_ops);
+
+-- Aggregate reports (app.services.reports), refreshed concurrently after each sync
+CREATE MATERIALIZED VIEW workboard.report_devices_by_role AS
+SELECT d.cluster_id,
+       coalesce(d.meta_data->>'role', '') AS role,
+       coalesce(d.meta_data->>'status', '') AS status,
+       count(*) AS devices
+FROM workboard.devices d
+WHERE d.cluster_id IS NOT NULL
+GROUP BY 1, 2, 3;
+CREATE UNIQUE INDEX uq_report_devices_by_role ON workboard.report_devices_by_role (cluster_id, role, status);
+
+CREATE MATERIALIZED VIEW workboard.report_unconnected_interfaces AS
+SELECT d.cluster_id, d.id AS device_id, d.name AS device,
+       count(*) AS interfaces,
+       array_agg(i.value->>'name' ORDER BY i.value->>'name') AS names
+FROM workboard.devices d
+CROSS JOIN LATERAL jsonb_array_elements(coalesce(d.interfaces, '[]'::jsonb)) AS i(value)
+WHERE d.cluster_id IS NOT NULL
+  AND coalesce((i.value->>'enabled')::boolean, true)
+  AND jsonb_typeof(i.value->'connected_to') IS DISTINCT FROM 'object'
+  AND NOT EXISTS (
+      SELECT 1 FROM workboard.connections c
+      WHERE (c.device_a_id = d.id AND c.interface_a = i.value->>'name')
+         OR (c.device_b_id = d.id AND c.interface_b = i.value->>'name')
+  )
+GROUP BY 1, 2, 3;
+CREATE UNIQUE INDEX uq_report_unconnected_interfaces ON workboard.report_unconnected_interfaces (device_id);
+CREATE INDEX idx_report_unconnected_interfaces_cluster_id ON workboard.report_unconnected_interfaces (cluster_id);
+
+CREATE MATERIALIZED VIEW workboard.report_interfaces_by_device_type AS
+SELECT d.cluster_id,
+       coalesce(d.device_type, '') AS device_type,
+       coalesce(i.value->>'type', '') AS interface_type,
+       count(DISTINCT d.id) AS devices,
+       count(*) AS interfaces,
+       count(*) FILTER (WHERE coalesce((i.value->>'enabled')::boolean, true)) AS enabled,
+       count(*) FILTER (WHERE jsonb_typeof(i.value->'connected_to') = 'object') AS connected
+FROM workboard.devices d
+CROSS JOIN LATERAL jsonb_array_elements(coalesce(d.interfaces, '[]'::jsonb)) AS i(value)
+WHERE d.cluster_id IS NOT NULL
+GROUP BY 1, 2, 3;
+CREATE UNIQUE INDEX uq_report_interfaces_by_device_type ON workboard.report_interfaces_by_device_type (cluster_id, device_type, interface_type);
+
 -- Update timestamp triggers
 CREATE OR REPLACE FUNCTION update_timestamp()
 RETURNS TRIGGER AS $$
@@ -140,3 +252,11 @@ $$ LANGUAGE plpgsql;
 
 -- Execute token hashing
 SELECT hash_existing_tokens();
+
+-- Record the migration this schema corresponds to, so `flask init-db` only
+-- applies migrations added after it. Update this when adding a migration.
+CREATE TABLE alembic_version (
+    version_num VARCHAR(32) NOT NULL,
+    CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
+);
+INSERT INTO alembic_version (version_num) VALUES ('20261019_180000');
@@ -1,7 +1,7 @@
 """add device roles
 
 Revision ID: 20250204_131900
-Revises: 20250204_122600
+Revises: add_users_table
 Create Date: 2025-02-04 13:19:00.000000
 
 """
@@ -10,7 +10,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '20250204_131900'
-down_revision = '20250204_122600'
+down_revision = 'add_users_table'
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,37 @@
+"""add indexes for hot lookup paths
+
+Revision ID: 20261019_090000
+Revises: 20250204_145600
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_090000'
+down_revision = '20250204_145600'
+branch_labels = None
+depends_on = None
+
+# (index name, table, definition). IF NOT EXISTS keeps this safe on databases
+# that were bootstrapped from init.sql, which already creates some of these.
+INDEXES = [
+    ('idx_devices_cluster_id', 'devices', '(cluster_id)'),
+    ('idx_devices_name', 'devices', '(name)'),
+    ('idx_devices_interfaces_gin', 'devices', 'USING gin (interfaces)'),
+    ('idx_connections_cluster_id', 'connections', '(cluster_id)'),
+    ('idx_connections_device_a_id', 'connections', '(device_a_id)'),
+    ('idx_connections_device_b_id', 'connections', '(device_b_id)'),
+]
+
+
+def upgrade():
+    for name, table, definition in INDEXES:
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON workboard.{table} {definition}')
+
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.execute(f'DROP INDEX IF EXISTS workboard.{name}')
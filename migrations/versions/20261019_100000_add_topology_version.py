@@ -0,0 +1,25 @@
+"""add topology_version to clusters
+
+Revision ID: 20261019_100000
+Revises: 20261019_090000
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_100000'
+down_revision = '20261019_090000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bumped by every sync and layout write; used for ETags and cache keys
+    op.add_column('clusters', sa.Column('topology_version', sa.Integer(), server_default='0', nullable=False), schema='workboard')
+
+
+def downgrade():
+    op.drop_column('clusters', 'topology_version', schema='workboard')
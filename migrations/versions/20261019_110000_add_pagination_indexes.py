@@ -0,0 +1,36 @@
+"""add keyset pagination and filter indexes
+
+Revision ID: 20261019_110000
+Revises: 20261019_100000
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_110000'
+down_revision = '20261019_100000'
+branch_labels = None
+depends_on = None
+
+# (index name, table, definition). Each matches a filter plus the keyset
+# ordering of /api/v1/devices (name, id) or /api/v1/connections (id).
+INDEXES = [
+    ('idx_devices_name_id', 'devices', '(name, id)'),
+    ('idx_devices_cluster_name_id', 'devices', '(cluster_id, name, id)'),
+    ('idx_devices_role_name_id', 'devices', "((meta_data->>'role'), name, id)"),
+    ('idx_devices_status_name_id', 'devices', "((meta_data->>'status'), name, id)"),
+    ('idx_connections_cluster_id_id', 'connections', '(cluster_id, id)'),
+]
+
+
+def upgrade():
+    for name, table, definition in INDEXES:
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON workboard.{table} {definition}')
+
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.execute(f'DROP INDEX IF EXISTS workboard.{name}')
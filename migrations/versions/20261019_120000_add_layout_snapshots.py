@@ -0,0 +1,37 @@
+"""add layout snapshots
+
+Revision ID: 20261019_120000
+Revises: 20261019_110000
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_120000'
+down_revision = '20261019_110000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('layout_snapshots',
+        sa.Column('id', postgresql.UUID(), nullable=False),
+        sa.Column('cluster_id', postgresql.UUID(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('positions', postgresql.JSONB(), nullable=False),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['cluster_id'], ['workboard.clusters.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cluster_id', 'name', name='uq_layout_snapshots_cluster_name'),
+        schema='workboard'
+    )
+
+
+def downgrade():
+    op.drop_table('layout_snapshots', schema='workboard')
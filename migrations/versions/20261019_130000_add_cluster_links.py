@@ -0,0 +1,48 @@
+"""add inter-cluster links
+
+Revision ID: 20261019_130000
+Revises: 20261019_120000
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_130000'
+down_revision = '20261019_120000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cluster_links',
+        sa.Column('id', postgresql.UUID(), nullable=False),
+        sa.Column('device_a_name', sa.String(length=255), nullable=False),
+        sa.Column('interface_a', sa.String(length=255), nullable=False),
+        sa.Column('device_b_name', sa.String(length=255), nullable=False),
+        sa.Column('interface_b', sa.String(length=255), nullable=False),
+        sa.Column('device_a_id', postgresql.UUID(), nullable=True),
+        sa.Column('device_b_id', postgresql.UUID(), nullable=True),
+        sa.Column('cluster_a_id', postgresql.UUID(), nullable=True),
+        sa.Column('cluster_b_id', postgresql.UUID(), nullable=True),
+        sa.Column('meta_data', postgresql.JSONB(), nullable=True),
+        sa.Column('synced_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['device_a_id'], ['workboard.devices.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['device_b_id'], ['workboard.devices.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['cluster_a_id'], ['workboard.clusters.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['cluster_b_id'], ['workboard.clusters.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('device_a_name', 'interface_a', 'device_b_name', 'interface_b', name='uq_cluster_links_endpoints'),
+        schema='workboard'
+    )
+    op.create_index('idx_cluster_links_cluster_a_id', 'cluster_links', ['cluster_a_id'], schema='workboard')
+    op.create_index('idx_cluster_links_cluster_b_id', 'cluster_links', ['cluster_b_id'], schema='workboard')
+
+
+def downgrade():
+    op.drop_index('idx_cluster_links_cluster_b_id', table_name='cluster_links', schema='workboard')
+    op.drop_index('idx_cluster_links_cluster_a_id', table_name='cluster_links', schema='workboard')
+    op.drop_table('cluster_links', schema='workboard')
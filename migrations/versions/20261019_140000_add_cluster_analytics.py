@@ -0,0 +1,25 @@
+"""add cluster analytics
+
+Revision ID: 20261019_140000
+Revises: 20261019_130000
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_140000'
+down_revision = '20261019_130000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('clusters', sa.Column('analytics', postgresql.JSONB(), nullable=True), schema='workboard')
+
+
+def downgrade():
+    op.drop_column('clusters', 'analytics', schema='workboard')
@@ -0,0 +1,35 @@
+"""add trigram device and interface search
+
+Revision ID: 20261019_150000
+Revises: 20261019_140000
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_150000'
+down_revision = '20261019_140000'
+branch_labels = None
+depends_on = None
+
+SEARCH_TEXT = "coalesce(name, '') || ' ' || coalesce(device_type, '') || ' ' || coalesce(meta_data->>'role', '')"
+INTERFACE_TEXT = ("coalesce(jsonb_path_query_array(interfaces, '$[*].name')::text, '') || ' ' || "
+                  "coalesce(jsonb_path_query_array(interfaces, '$[*].description')::text, '')")
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute(f'ALTER TABLE workboard.devices ADD COLUMN search_text text GENERATED ALWAYS AS ({SEARCH_TEXT}) STORED')
+    op.execute(f'ALTER TABLE workboard.devices ADD COLUMN interface_text text GENERATED ALWAYS AS ({INTERFACE_TEXT}) STORED')
+    op.execute('CREATE INDEX IF NOT EXISTS idx_devices_search_text_trgm ON workboard.devices USING gin (search_text gin_trgm_ops)')
+    op.execute('CREATE INDEX IF NOT EXISTS idx_devices_interface_text_trgm ON workboard.devices USING gin (interface_text gin_trgm_ops)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS workboard.idx_devices_interface_text_trgm')
+    op.execute('DROP INDEX IF EXISTS workboard.idx_devices_search_text_trgm')
+    op.drop_column('devices', 'interface_text', schema='workboard')
+    op.drop_column('devices', 'search_text', schema='workboard')
@@ -0,0 +1,43 @@
+"""add topology change journal
+
+Revision ID: 20261019_160000
+Revises: 20261019_150000
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_160000'
+down_revision = '20261019_150000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('clusters', sa.Column('changes_since', sa.Integer(), nullable=False, server_default='0'), schema='workboard')
+    # Nothing was journaled before this revision
+    op.execute('UPDATE workboard.clusters SET changes_since = topology_version')
+    op.create_table('topology_changes',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('cluster_id', postgresql.UUID(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('element', sa.String(length=8), nullable=False),
+        sa.Column('op', sa.String(length=16), nullable=False),
+        sa.Column('element_id', sa.String(length=64), nullable=False),
+        sa.Column('data', postgresql.JSONB(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['cluster_id'], ['workboard.clusters.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        schema='workboard'
+    )
+    op.create_index('idx_topology_changes_cluster_version', 'topology_changes', ['cluster_id', 'version', 'id'], schema='workboard')
+
+
+def downgrade():
+    op.drop_index('idx_topology_changes_cluster_version', table_name='topology_changes', schema='workboard')
+    op.drop_table('topology_changes', schema='workboard')
+    op.drop_column('clusters', 'changes_since', schema='workboard')
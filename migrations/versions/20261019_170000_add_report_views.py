@@ -0,0 +1,71 @@
+"""add aggregate report materialized views
+
+Revision ID: 20261019_170000
+Revises: 20261019_160000
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_170000'
+down_revision = '20261019_160000'
+branch_labels = None
+depends_on = None
+
+
+# Unique indexes let the worker refresh the views CONCURRENTLY
+def upgrade():
+    op.execute("""
+        CREATE MATERIALIZED VIEW workboard.report_devices_by_role AS
+        SELECT d.cluster_id,
+               coalesce(d.meta_data->>'role', '') AS role,
+               coalesce(d.meta_data->>'status', '') AS status,
+               count(*) AS devices
+        FROM workboard.devices d
+        WHERE d.cluster_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+    op.execute('CREATE UNIQUE INDEX uq_report_devices_by_role ON workboard.report_devices_by_role (cluster_id, role, status)')
+    op.execute("""
+        CREATE MATERIALIZED VIEW workboard.report_unconnected_interfaces AS
+        SELECT d.cluster_id, d.id AS device_id, d.name AS device,
+               count(*) AS interfaces,
+               array_agg(i.value->>'name' ORDER BY i.value->>'name') AS names
+        FROM workboard.devices d
+        CROSS JOIN LATERAL jsonb_array_elements(coalesce(d.interfaces, '[]'::jsonb)) AS i(value)
+        WHERE d.cluster_id IS NOT NULL
+          AND coalesce((i.value->>'enabled')::boolean, true)
+          AND jsonb_typeof(i.value->'connected_to') IS DISTINCT FROM 'object'
+          AND NOT EXISTS (
+              SELECT 1 FROM workboard.connections c
+              WHERE (c.device_a_id = d.id AND c.interface_a = i.value->>'name')
+                 OR (c.device_b_id = d.id AND c.interface_b = i.value->>'name')
+          )
+        GROUP BY 1, 2, 3
+    """)
+    op.execute('CREATE UNIQUE INDEX uq_report_unconnected_interfaces ON workboard.report_unconnected_interfaces (device_id)')
+    op.execute('CREATE INDEX idx_report_unconnected_interfaces_cluster_id ON workboard.report_unconnected_interfaces (cluster_id)')
+    op.execute("""
+        CREATE MATERIALIZED VIEW workboard.report_interfaces_by_device_type AS
+        SELECT d.cluster_id,
+               coalesce(d.device_type, '') AS device_type,
+               coalesce(i.value->>'type', '') AS interface_type,
+               count(DISTINCT d.id) AS devices,
+               count(*) AS interfaces,
+               count(*) FILTER (WHERE coalesce((i.value->>'enabled')::boolean, true)) AS enabled,
+               count(*) FILTER (WHERE jsonb_typeof(i.value->'connected_to') = 'object') AS connected
+        FROM workboard.devices d
+        CROSS JOIN LATERAL jsonb_array_elements(coalesce(d.interfaces, '[]'::jsonb)) AS i(value)
+        WHERE d.cluster_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+    op.execute('CREATE UNIQUE INDEX uq_report_interfaces_by_device_type ON workboard.report_interfaces_by_device_type (cluster_id, device_type, interface_type)')
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS workboard.report_interfaces_by_device_type')
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS workboard.report_unconnected_interfaces')
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS workboard.report_devices_by_role')
@@ -0,0 +1,24 @@
+"""add cluster graph digest
+
+Revision ID: 20261019_180000
+Revises: 20261019_170000
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_180000'
+down_revision = '20261019_170000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('clusters', sa.Column('graph_digest', sa.String(length=64), nullable=True), schema='workboard')
+
+
+def downgrade():
+    op.drop_column('clusters', 'graph_digest', schema='workboard')
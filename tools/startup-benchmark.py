@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark Script
+
+Measures cold-start time of the Flask application: each run imports the app
+package and calls create_app() in a fresh Python process, the same work every
+uvicorn worker and worker container does when it starts. No database, Redis or
+RabbitMQ connection is needed, and none should be made during startup.
+
+Usage:
+    python startup-benchmark.py
+    python startup-benchmark.py --runs 20 --config production
+    python startup-benchmark.py --max-seconds 1.5  # Exit non-zero if the median is slower
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+# ANSI color codes for terminal output
+class Colors:
+    HEADER = '\033[95m'
+    GREEN = '\033[92m'
+    FAIL = '\033[91m'
+    END = '\033[0m'
+    BOLD = '\033[1m'
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child process and prints the elapsed seconds
+CHILD_SCRIPT = """
+import time
+start = time.perf_counter()
+from app import create_app
+create_app({config!r})
+print(time.perf_counter() - start)
+"""
+
+def measure(config_name):
+    """Time one cold start in a fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT.format(config=config_name)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure application cold-start time')
+    parser.add_argument('--runs', type=int, default=10, help='Number of cold starts to measure')
+    parser.add_argument('--config', default='production', help='Config name passed to create_app')
+    parser.add_argument('--max-seconds', type=float, help='Fail if the median start time exceeds this')
+    args = parser.parse_args()
+
+    print(f"\n{Colors.BOLD}Startup Benchmark{Colors.END}")
+    print(f"Config: {args.config}, runs: {args.runs}")
+
+    timings = []
+    for run in range(args.runs):
+        try:
+            timings.append(measure(args.config))
+        except subprocess.CalledProcessError as e:
+            print(f"{Colors.FAIL}✗ Run {run + 1} failed:{Colors.END}\n{e.stderr}")
+            sys.exit(1)
+
+    median = statistics.median(timings)
+    print(f"min {min(timings):.3f}s  median {median:.3f}s  max {max(timings):.3f}s")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"{Colors.FAIL}✗ Median start time exceeds {args.max_seconds:.3f}s{Colors.END}")
+        sys.exit(1)
+    print(f"{Colors.GREEN}✓ Startup benchmark complete{Colors.END}")
+
+if __name__ == '__main__':
+    main()